@@ -0,0 +1,68 @@
+"""
+Scaling of the flat BOM.diff from 1k to 200k lines. Time per line should stay roughly constant.
+
+Each size is diffed item by item and with columnar_diff. "columnar first" includes building the columns, which
+later diffs of the same BOMs reuse.
+
+Run from the repository root:
+    python -m benchmarks.bench_flat_diff
+"""
+import random
+import time
+
+from bom import PropelBOM, SolidworksBOM
+from item.item import Item
+
+from .common import best_of, setup_filters
+
+SIZES = (1000, 10000, 50000, 100000, 200000)
+HEADER = {"PART NUMBER": 0, "Description": 1, "Quantity": 2, "Revision": 3}
+
+
+def make_bom(cls, size, seed):
+    rnd = random.Random(seed)
+    bom = cls("%s-%s" % (cls.__name__, size))
+    bom.header = HEADER
+    bom.set_diff_props(["description", "quantity", "revision"])
+    for index in range(size):
+        # ~5% of lines only exist on one side and ~10% of quantities differ
+        number = 100000 + index if rnd.random() > 0.05 else 900000 + rnd.randrange(size)
+        quantity = 1 if rnd.random() > 0.1 else 2
+        bom.append(
+            bom.create_item([str(number), "part %s" % number, str(quantity), "1"])
+        )
+    return bom
+
+
+def main():
+    setup_filters()
+    Item.set_primary_prop("propel_number")
+    Item.set_equivalent_mapping([])
+    print(
+        "%10s %12s %16s %20s %16s"
+        % ("lines", "diff (ms)", "per line (us)", "columnar first (ms)", "columnar (ms)")
+    )
+    for size in SIZES:
+        left = make_bom(SolidworksBOM, size, 1)
+        right = make_bom(PropelBOM, size, 2)
+        duration = best_of(lambda: left.diff(right))
+
+        left.set_columnar_diff(True)
+        t0 = time.perf_counter()
+        left.diff(right)
+        first_duration = time.perf_counter() - t0
+        columnar_duration = best_of(lambda: left.diff(right))
+        print(
+            "%10s %12.1f %16.3f %20.1f %16.1f"
+            % (
+                size,
+                duration * 1e3,
+                duration / size * 1e6,
+                first_duration * 1e3,
+                columnar_duration * 1e3,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Re-diffing after one part of the left BOM changes: a full StructuredBOM.diff against an IncrementalDiff that
+diffed the unchanged BOMs before. The right BOM is the same object both times, as it is when only one side of the
+comparison is edited between runs.
+
+Run from the repository root:
+    python -m benchmarks.bench_incremental_diff [rows]
+"""
+import sys
+import tempfile
+
+from bom import IncrementalDiff, PropelStructured, SolidworksStructured
+from item.item import Item
+
+from .bench_item_memory import write_boms
+from .common import best_of, edit_parts, load_bom, setup_filters
+
+DEFAULT_ROWS = 100000
+FAN_OUT = 3
+MAX_DEPTH = 8
+DIFF_PROPS = ["description", "quantity"]
+
+
+def main():
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    setup_filters()
+    Item.set_primary_prop("propel_number")
+
+    with tempfile.TemporaryDirectory() as directory:
+        left_path, right_path = write_boms(directory, num_rows, FAN_OUT, MAX_DEPTH)
+        left = load_bom(SolidworksStructured, left_path, DIFF_PROPS)
+        right = load_bom(PropelStructured, right_path, DIFF_PROPS)
+        edit_parts(left_path, [num_rows // 2])
+        edited_left = load_bom(SolidworksStructured, left_path, DIFF_PROPS)
+
+    def rediff():
+        session = IncrementalDiff()
+        session.diff(left, right)
+        return session
+
+    # every repeat starts from a session that has only seen the unedited BOMs
+    sessions = [rediff() for _ in range(3)]
+
+    print("%s items, %s levels deep, one part edited" % (len(left.items), MAX_DEPTH))
+    print("%22s %10.1f ms" % ("full diff", best_of(lambda: edited_left.diff(right)) * 1e3))
+    print("%22s %10.1f ms" % ("incremental diff", best_of(lambda: sessions.pop().diff(edited_left, right)) * 1e3))
+
+
+if __name__ == "__main__":
+    main()
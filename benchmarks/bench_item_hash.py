@@ -0,0 +1,45 @@
+"""
+Shows that hashing an item no longer scales with the size of equivalent_items.csv.
+
+Run from the repository root:
+    python -m benchmarks.bench_item_hash
+"""
+from item.item import Item
+
+from .common import best_of, setup_filters
+
+NUM_ITEMS = 20000
+TABLE_SIZES = (0, 10, 100, 1000, 10000)
+
+
+def make_items(num_items):
+    header = {"PART NUMBER": 0, "Description": 1, "Quantity": 2}
+    return [
+        Item.from_line(header, [str(100000 + index), "part %s" % index, "1"])
+        for index in range(num_items)
+    ]
+
+
+def make_equivalence_table(size):
+    return [[str(200000 + index), str(300000 + index)] for index in range(size)]
+
+
+def main():
+    setup_filters()
+    Item.set_primary_prop("propel_number")
+    print("%12s %16s %16s" % ("table size", "first hash (us)", "set build (ms)"))
+    for size in TABLE_SIZES:
+        Item.set_equivalent_mapping(make_equivalence_table(size))
+        items = make_items(NUM_ITEMS)
+
+        # first hash of each item pays for its key lookup (and the index build on the very first one)
+        first_hash = best_of(lambda: [hash(item) for item in items], repeat=1)
+        set_build = best_of(lambda: set(items))
+        print(
+            "%12s %16.3f %16.3f"
+            % (size, first_hash / NUM_ITEMS * 1e6, set_build * 1e3)
+        )
+
+
+if __name__ == "__main__":
+    main()
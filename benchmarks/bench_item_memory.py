@@ -0,0 +1,76 @@
+"""
+Memory retained per item after loading a structured BOM, for each structured BOM type.
+
+Bytes per item is what tracemalloc still holds once the BOM is loaded (items, tree and indexes), divided by the
+number of items.
+
+Run from the repository root:
+    python -m benchmarks.bench_item_memory [rows]
+"""
+import csv
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from bom import PropelStructured, SolidworksStructured
+from item.item import Item
+
+from .common import setup_filters
+from .synthetic import iter_tree_rows
+
+DEFAULT_ROWS = 100000
+FAN_OUT = 10
+MAX_DEPTH = 4
+
+
+def write_boms(directory, num_rows, fan_out=FAN_OUT, max_depth=MAX_DEPTH):
+    solidworks_path = os.path.join(directory, "solidworks.csv")
+    propel_path = os.path.join(directory, "propel.csv")
+    with open(solidworks_path, "w", newline="") as solidworks_file, open(
+        propel_path, "w", newline=""
+    ) as propel_file:
+        solidworks = csv.writer(solidworks_file)
+        propel = csv.writer(propel_file)
+        solidworks.writerow(["ITEM NO.", "PART NUMBER", "Description", "QTY.", "Category", "Revision"])
+        propel.writerow(["level", "Item Number", "Description", "Quantity", "Category Name", "Revision"])
+        for index, (tree_num, level) in enumerate(
+            iter_tree_rows(num_rows, fan_out, max_depth)
+        ):
+            number = str(100000 + index)
+            description = "part %s" % number
+            category = "ASM" if level < max_depth else "PRT"
+            solidworks.writerow([tree_num, number, description, 1 + index % 4, category, 1])
+            propel.writerow([level, number, description, 1 + index % 4, category, 1])
+    return solidworks_path, propel_path
+
+
+def measure(bom_cls, path):
+    gc.collect()
+    tracemalloc.start()
+    bom = bom_cls.from_file(path)
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained / len(bom.items), len(bom.items)
+
+
+def main():
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    setup_filters()
+    Item.set_primary_prop("propel_number")
+
+    with tempfile.TemporaryDirectory() as directory:
+        solidworks_path, propel_path = write_boms(directory, num_rows)
+        print("%22s %10s %16s" % ("BOM type", "items", "bytes per item"))
+        for bom_cls, path in (
+            (SolidworksStructured, solidworks_path),
+            (PropelStructured, propel_path),
+        ):
+            bytes_per_item, num_items = measure(bom_cls, path)
+            print("%22s %10s %16.0f" % (bom_cls.__name__, num_items, bytes_per_item))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Structured diff of BOMs that are mostly the same, going into every matched assembly against skipping the ones
+whose content digests are equal. The digests of both BOMs are part of the skipping time.
+
+Run from the repository root:
+    python -m benchmarks.bench_skip_identical [rows] [edited parts]
+"""
+import random
+import sys
+import tempfile
+
+from bom import PropelStructured, SolidworksStructured
+from item.item import Item
+
+from .bench_item_memory import write_boms
+from .common import best_of, edit_parts, load_bom, setup_filters
+
+DEFAULT_ROWS = 100000
+DEFAULT_EDITS = 20
+FAN_OUT = 3
+MAX_DEPTH = 8
+DIFF_PROPS = ["description", "quantity"]
+
+
+def main():
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    num_edits = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_EDITS
+    setup_filters()
+    Item.set_primary_prop("propel_number")
+
+    with tempfile.TemporaryDirectory() as directory:
+        left_path, right_path = write_boms(directory, num_rows, FAN_OUT, MAX_DEPTH)
+        right = load_bom(PropelStructured, right_path, DIFF_PROPS)
+        # edits random parts, the header is row 0
+        edit_parts(left_path, random.Random(0).sample(range(1, num_rows + 1), num_edits))
+        left = load_bom(SolidworksStructured, left_path, DIFF_PROPS)
+
+    def diff(skip_identical):
+        left.set_skip_identical_assemblies(skip_identical)
+        return left.diff(right)
+
+    print("%s items, %s levels deep, %s parts edited" % (len(left.items), MAX_DEPTH, num_edits))
+    for name, skip_identical in (("every assembly", False), ("skip identical", True)):
+        num_branches = sum(1 for _ in left.iter_tree(diff(skip_identical)))
+        print(
+            "%22s %10.1f ms %8s report branches"
+            % (name, best_of(lambda: diff(skip_identical)) * 1e3, num_branches)
+        )
+
+
+if __name__ == "__main__":
+    main()
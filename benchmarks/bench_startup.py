@@ -0,0 +1,64 @@
+"""
+Startup time: how long importing the UI and the CLI takes, from python -X importtime in a fresh interpreter (best of a
+few runs). Fails, with exit status 1, when an import takes longer than its budget or pulls in a module that's only
+meant to load on first use, so it can gate a build. Lists the slowest modules either way.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup [budget scale]
+"""
+import subprocess
+import sys
+
+# module imported at startup -> budget in ms. Generous for a desktop, a slow machine can scale them
+BUDGETS_MS = {
+    "ui.mainui": 200,
+    "bomdiff.cli": 150,
+}
+# modules that should only be imported once a file is read or a report is written
+LAZY_MODULES = ("openpyxl", "xlrd", "helpers.xlsx_converter")
+RUNS = 5
+SLOWEST = 10
+
+
+def import_times(module):
+    # {module: (self us, cumulative us)} from one fresh interpreter, and the modules it imported
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import %s" % module],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        check=True,
+    ).stderr.decode()
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    failures = []
+    for module, budget_ms in BUDGETS_MS.items():
+        budget_ms *= scale
+        runs = [import_times(module) for _ in range(RUNS)]
+        best = min(runs, key=lambda times: times[module][1])
+        total_ms = best[module][1] / 1e3
+        print("%22s %10.1f ms (budget %.0f ms)" % (module, total_ms, budget_ms))
+        for name, (self_us, _) in sorted(best.items(), key=lambda entry: -entry[1][0])[:SLOWEST]:
+            print("%22s %10.1f ms" % (name, self_us / 1e3))
+
+        if total_ms > budget_ms:
+            failures.append("%s took %.1f ms, over its %.0f ms budget" % (module, total_ms, budget_ms))
+        eager = [name for name in LAZY_MODULES if name in best]
+        if len(eager) > 0:
+            failures.append("%s imports %s at startup" % (module, ", ".join(eager)))
+
+    for failure in failures:
+        print("FAILED: %s" % failure)
+    return 1 if len(failures) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
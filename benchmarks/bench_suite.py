@@ -0,0 +1,241 @@
+"""
+Every stage of a structured diff, for each BOM type and file format, on synthetic BOM pairs. Each stage is timed
+(best of --repeat runs) and, in a separate pass under tracemalloc, measured for peak and retained memory, so the
+tracing doesn't slow the timings down. Results go to a JSON file. Passing the file of an earlier run to --compare
+prints how each stage changed since, e.g. between two commits.
+
+Run from the repository root:
+    python -m benchmarks.bench_suite [--rows N] [--output results.json] [--compare old.json] ...
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from bom import FLAT_BOM_TYPES, STRUCTURED_BOM_TYPES
+from helpers.xlsx_converter import rows_to_xlsx
+from item.item import Item
+from ui.config import FilterConfig
+
+from .common import DEFAULT_FILTERS, best_of, setup_filters
+from .synthetic import DIFF_PROPS, FORMATS, LAYOUTS, BomSpec, equivalent_items, generate_parts, write_bom_pair
+
+# Onshape names its parts in a Name column
+SUITE_FILTERS = dict(DEFAULT_FILTERS, name=FilterConfig(filters=["Name"], type="str"))
+
+
+def parse_args(argv):
+    spec = BomSpec()
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_suite")
+    parser.add_argument("--rows", type=int, default=spec.num_rows, help="parts in each BOM")
+    parser.add_argument("--depth", type=int, default=spec.max_depth, help="levels in the tree")
+    parser.add_argument("--fan-out", type=int, default=spec.fan_out, help="children per assembly")
+    parser.add_argument(
+        "--duplicate-rate",
+        type=float,
+        default=spec.duplicate_rate,
+        help="fraction of bottom level parts reused from elsewhere in the tree",
+    )
+    parser.add_argument(
+        "--equivalents", type=int, default=spec.num_equivalents, help="entries in the equivalence table"
+    )
+    parser.add_argument(
+        "--changed", type=float, default=spec.change_rate, help="fraction of parts edited in the right BOM"
+    )
+    parser.add_argument("--seed", type=int, default=spec.seed)
+    parser.add_argument("--layouts", default=",".join(LAYOUTS), help="comma separated BOM types")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="comma separated file formats")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage, the best one is kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--output", default="bench_suite.json", help="JSON file the results are written to")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare with")
+    args = parser.parse_args(argv)
+
+    for layout in args.layouts.split(","):
+        if layout not in LAYOUTS:
+            parser.error("unknown BOM type %s, expected one of %s" % (layout, ", ".join(LAYOUTS)))
+    for file_format in args.formats.split(","):
+        if file_format not in FORMATS:
+            parser.error("unknown format %s, expected one of %s" % (file_format, ", ".join(FORMATS)))
+    return args
+
+
+def make_stages(layout, left_path, right_path, output_path):
+    """
+    [(stage name, fn)] in pipeline order. Each fn runs its stage on what the stages before it left behind, and can
+    be run again on its own.
+    """
+    bom_cls = STRUCTURED_BOM_TYPES[layout]
+    flat_cls = FLAT_BOM_TYPES[layout]
+    state = {}
+
+    def load(path):
+        bom = bom_cls.from_file(path)
+        bom.set_diff_props(DIFF_PROPS)
+        return bom
+
+    def from_file():
+        state["left"] = load(left_path)
+        state["right"] = load(right_path)
+
+    def build_tree():
+        for bom in (state["left"], state["right"]):
+            bom.clear_tree()
+            bom.flattened = {}
+            bom._build_tree()
+
+    def diff():
+        state["diff_report"] = state["left"].diff(state["right"])
+
+    def assemblies_only():
+        for side in ("left", "right"):
+            bom = state[side]
+            assem_bom = bom.from_tree(bom.name, bom.assemblies_only())
+            state[side + "_assem"] = flat_cls.from_list(assem_bom.name, assem_bom.flattened)
+
+    def diff_report_to_table():
+        state["table"] = state["left"].diff_report_to_table(state["diff_report"], state["right"])
+
+    def report_to_xlsx():
+        rows = state["left"].iter_diff_report_table(state["diff_report"], state["right"])
+        rows_to_xlsx(rows, "Diff", path=output_path)
+
+    return [
+        ("from_file", from_file),
+        ("_build_tree", build_tree),
+        ("diff", diff),
+        ("assemblies_only", assemblies_only),
+        ("diff_report_to_table", diff_report_to_table),
+        ("report_to_xlsx", report_to_xlsx),
+    ], state
+
+
+def measure_memory(fn):
+    # (peak, retained) bytes allocated while fn runs. Retained is what's still held once it returns
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, retained
+
+
+def run_case(layout, file_format, left_path, right_path, directory, args):
+    output_path = os.path.join(directory, "%s-%s-report.xlsx" % (layout, file_format))
+    results = []
+    stages, state = make_stages(layout, left_path, right_path, output_path)
+    for stage, fn in stages:
+        results.append(
+            {
+                "layout": layout,
+                "format": file_format,
+                "stage": stage,
+                "seconds": best_of(fn, args.repeat),
+            }
+        )
+    rows = len(state["left"].items)
+
+    if not args.no_memory:
+        # a fresh set of stages, so memory held from the timed runs isn't counted as retained
+        stages, state = make_stages(layout, left_path, right_path, output_path)
+        for result, (stage, fn) in zip(results, stages):
+            result["peak_bytes"], result["retained_bytes"] = measure_memory(fn)
+    for result in results:
+        result["rows"] = rows
+    return results
+
+
+def git_commit():
+    # the commit measured, when run from a git checkout
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode().strip()
+
+
+def print_results(results):
+    print("%-12s %-5s %22s %10s %10s %10s" % ("BOM type", "file", "stage", "time", "peak", "retained"))
+    for result in results:
+        memory = ""
+        if "peak_bytes" in result:
+            memory = "%8.1f MB %8.1f MB" % (result["peak_bytes"] / 2 ** 20, result["retained_bytes"] / 2 ** 20)
+        print(
+            "%-12s %-5s %22s %10.1f ms %s"
+            % (result["layout"], result["format"], result["stage"], result["seconds"] * 1e3, memory)
+        )
+
+
+def print_comparison(old, new):
+    # per stage ratio of new to old. Above 1 is slower or bigger
+    old_results = {(result["layout"], result["format"], result["stage"]): result for result in old["results"]}
+    print("compared with %s (%s)" % (old.get("commit"), old.get("timestamp")))
+    if old["params"] != new["params"]:
+        print("warning: the runs used different parameters, %s against %s" % (old["params"], new["params"]))
+    print("%-12s %-5s %22s %10s %10s" % ("BOM type", "file", "stage", "time", "peak"))
+    for result in new["results"]:
+        old_result = old_results.get((result["layout"], result["format"], result["stage"]))
+        if old_result is None:
+            continue
+        peak = ""
+        if old_result.get("peak_bytes") and "peak_bytes" in result:
+            peak = "%9.2fx" % (result["peak_bytes"] / old_result["peak_bytes"])
+        print(
+            "%-12s %-5s %22s %9.2fx %s"
+            % (result["layout"], result["format"], result["stage"], result["seconds"] / old_result["seconds"], peak)
+        )
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    spec = BomSpec(
+        num_rows=args.rows,
+        max_depth=args.depth,
+        fan_out=args.fan_out,
+        duplicate_rate=args.duplicate_rate,
+        num_equivalents=args.equivalents,
+        change_rate=args.changed,
+        seed=args.seed,
+    )
+    setup_filters(SUITE_FILTERS)
+    left_parts, right_parts, aliases = generate_parts(spec)
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for layout in args.layouts.split(","):
+            Item.set_primary_prop(LAYOUTS[layout][2])
+            Item.set_equivalent_mapping(equivalent_items(layout, left_parts, aliases))
+            for file_format in args.formats.split(","):
+                left_path, right_path = write_bom_pair(directory, layout, file_format, left_parts, right_parts)
+                results.extend(run_case(layout, file_format, left_path, right_path, directory, args))
+
+    run = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": dict(spec.to_dict(), repeat=args.repeat),
+        "results": results,
+    }
+    print_results(results)
+    with open(args.output, "w") as file:
+        json.dump(run, file, indent=2)
+    print("results written to %s" % args.output)
+
+    if args.compare is not None:
+        with open(args.compare) as file:
+            print_comparison(json.load(file), run)
+
+
+if __name__ == "__main__":
+    main()
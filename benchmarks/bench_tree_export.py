@@ -0,0 +1,55 @@
+"""
+Time of the structured BOM exports on a large BOM: the JSON and NDJSON trees, the flattened CSV with raw and extended
+quantities and the YAML and NDJSON diff reports.
+
+Run from the repository root:
+    python -m benchmarks.bench_tree_export [rows]
+"""
+import os
+import sys
+import tempfile
+
+from bom import EXTENDED_QUANTITIES, SolidworksStructured
+from item.item import Item
+
+from .bench_item_memory import write_boms
+from .common import best_of, setup_filters
+
+DEFAULT_ROWS = 100000
+
+
+def main():
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    setup_filters()
+    Item.set_primary_prop("propel_number")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path, _ = write_boms(directory, num_rows)
+        left = SolidworksStructured.from_file(path)
+        right = SolidworksStructured.from_file(path)
+        diff_report = left.diff(right)
+
+        exports = (
+            ("to_json", lambda: left.to_json(os.path.join(directory, "tree.json"))),
+            ("to_ndjson", lambda: left.to_ndjson(os.path.join(directory, "tree.ndjson"))),
+            ("flattened_to_csv", lambda: left.flattened_to_csv(os.path.join(directory, "flat.csv"))),
+            (
+                "extended flattened",
+                lambda: left.flattened_to_csv(os.path.join(directory, "flat.csv"), EXTENDED_QUANTITIES),
+            ),
+            (
+                "diff_report_to_yaml",
+                lambda: left.diff_report_to_yaml(os.path.join(directory, "diff.yaml"), diff_report, right),
+            ),
+            (
+                "diff_report_to_ndjson",
+                lambda: left.diff_report_to_ndjson(os.path.join(directory, "diff.ndjson"), diff_report, right),
+            ),
+        )
+        print("%s items" % len(left.items))
+        for name, fn in exports:
+            print("%22s %10.1f ms" % (name, best_of(fn, 1) * 1e3))
+
+
+if __name__ == "__main__":
+    main()
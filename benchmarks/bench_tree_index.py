@@ -0,0 +1,46 @@
+"""
+Branch lookups on a deep structured BOM: every tree number looked up once, linking parents, and the structured
+diff and report table, which look up a branch for each assembly.
+
+Run from the repository root:
+    python -m benchmarks.bench_tree_index [rows]
+"""
+import sys
+import tempfile
+
+from bom import SolidworksStructured
+from item.item import Item
+
+from .bench_item_memory import write_boms
+from .common import best_of, setup_filters
+
+DEFAULT_ROWS = 100000
+FAN_OUT = 3
+MAX_DEPTH = 8
+
+
+def main():
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    setup_filters()
+    Item.set_primary_prop("propel_number")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path, _ = write_boms(directory, num_rows, FAN_OUT, MAX_DEPTH)
+        left = SolidworksStructured.from_file(path)
+        right = SolidworksStructured.from_file(path)
+
+    tree_nums = [item.tree_num for item in left.items]
+    diff_report = left.diff(right)
+    timings = (
+        ("lookup every branch", lambda: [left.branch_from_tree_num(num) for num in tree_nums]),
+        ("link parents", left._link_parents),
+        ("structured diff", lambda: left.diff(right)),
+        ("report table", lambda: sum(1 for _ in left.iter_diff_report_table(diff_report, right, True))),
+    )
+    print("%s items, %s levels deep" % (len(left.items), MAX_DEPTH))
+    for name, fn in timings:
+        print("%22s %10.1f ms" % (name, best_of(fn) * 1e3))
+
+
+if __name__ == "__main__":
+    main()
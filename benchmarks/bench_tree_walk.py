@@ -0,0 +1,75 @@
+"""
+Walking a structured BOM tree: the recursive generator iter_tree used to be against the explicit stack walks in
+each order, with and without pruning. Ends with a chain of assemblies deeper than Python's recursion limit, which
+only the explicit stack can walk.
+
+Run from the repository root:
+    python -m benchmarks.bench_tree_walk [nodes]
+"""
+import sys
+
+from bom import StructuredBOM
+from bom.tree_walk import LEVEL_ORDER, POST_ORDER, PRE_ORDER, walk_tree
+
+from .synthetic import iter_tree_rows
+from .common import best_of
+
+DEFAULT_NODES = 200000
+FAN_OUT = 4
+MAX_DEPTH = 10
+CHAIN_DEPTH = 5000
+
+
+def build_bom(tree_nums):
+    # the tree numbers stand in for the items, the walks never look at them
+    bom = StructuredBOM("bench")
+    for tree_num in tree_nums:
+        bom.tree_index.insert(bom.tree, tree_num)[0] = tree_num
+    return bom
+
+
+def iter_tree_recursive(subtree, level=0):
+    # StructuredBOM.iter_tree before it kept its own stack
+    for tree_num in subtree:
+        item = subtree[tree_num][0]
+        yield tree_num, subtree, item, level
+        yield from iter_tree_recursive(subtree[tree_num][1], level + 1)
+
+
+def count(branches):
+    return sum(1 for _ in branches)
+
+
+def main():
+    num_nodes = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_NODES
+    bom = build_bom(tree_num for tree_num, _ in iter_tree_rows(num_nodes, FAN_OUT, MAX_DEPTH))
+
+    def prune(tree_num, subtree, item, level):
+        # skips the bottom two levels
+        return level >= MAX_DEPTH - 3
+
+    timings = (
+        ("recursive pre-order", lambda: count(iter_tree_recursive(bom.tree))),
+        ("pre-order", lambda: count(walk_tree(bom.tree, PRE_ORDER))),
+        ("post-order", lambda: count(walk_tree(bom.tree, POST_ORDER))),
+        ("level order", lambda: count(walk_tree(bom.tree, LEVEL_ORDER))),
+        ("pre-order, pruned", lambda: count(walk_tree(bom.tree, PRE_ORDER, prune))),
+    )
+    print("%s nodes, %s levels deep" % (len(bom.tree_index), MAX_DEPTH))
+    for name, fn in timings:
+        print("%22s %10.1f ms" % (name, best_of(fn) * 1e3))
+
+    chain = build_bom(".".join(["1"] * depth) for depth in range(1, CHAIN_DEPTH + 1))
+    try:
+        count(iter_tree_recursive(chain.tree))
+        recursive = "walked"
+    except RecursionError:
+        recursive = "RecursionError"
+    print(
+        "%s levels deep: recursive %s, pre-order %s, post-order %s branches"
+        % (CHAIN_DEPTH, recursive, count(chain.iter_tree()), count(chain.iter_tree(order=POST_ORDER)))
+    )
+
+
+if __name__ == "__main__":
+    main()
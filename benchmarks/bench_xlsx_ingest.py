@@ -0,0 +1,103 @@
+"""
+Time and peak memory of XLSX ingestion on a 100k row Propel style export.
+
+"full load" reads the sheet into memory first, like the old xlrd based from_xlsx did (xlrd itself is timed
+too when an xlrd < 2.0 that can still read .xlsx is installed). "streaming" is BOM.from_xlsx.
+
+Run from the repository root:
+    python -m benchmarks.bench_xlsx_ingest [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import openpyxl
+
+from bom import PropelBOM
+from item.item import Item
+
+from .common import setup_filters
+
+HEADER = ["Item Number", "Description", "Quantity", "Category Name", "Revision"]
+
+
+def write_xlsx(path, num_rows):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("BOM")
+    sheet.append(HEADER)
+    for index in range(num_rows):
+        sheet.append([100000 + index, "part %s" % index, 1 + index % 4, "PRT", 1])
+    workbook.save(path)
+
+
+def load_full(path):
+    workbook = openpyxl.load_workbook(path)
+    sheet = workbook.worksheets[0]
+    rows = [[cell.value for cell in row] for row in sheet.iter_rows()]
+    bom = PropelBOM(os.path.basename(path))
+    bom.header = bom.create_header([str(value) for value in rows[0]])
+    for line in rows[1:]:
+        bom.append(bom.create_item(["" if value is None else value for value in line]))
+    return bom
+
+
+def load_xlrd(path):
+    import xlrd
+
+    workbook = xlrd.open_workbook(path)
+    sheet = workbook.sheet_by_index(0)
+    bom = PropelBOM(os.path.basename(path))
+    bom.header = bom.create_header([str(value) for value in sheet.row_values(0)])
+    for row_num in range(1, sheet.nrows):
+        bom.append(bom.create_item(sheet.row_values(row_num)))
+    return bom
+
+
+def load_streaming(path):
+    return PropelBOM.from_xlsx(path)
+
+
+def measure(fn, path):
+    t0 = time.perf_counter()
+    bom = fn(path)
+    duration = time.perf_counter() - t0
+    del bom
+
+    tracemalloc.start()
+    bom = fn(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duration, peak, len(bom)
+
+
+def xlrd_can_read_xlsx():
+    try:
+        import xlrd
+    except ImportError:
+        return False
+    return int(xlrd.__VERSION__.split(".")[0]) < 2
+
+
+def main():
+    num_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    setup_filters()
+    Item.set_primary_prop("propel_number")
+    Item.set_equivalent_mapping([])
+
+    loaders = [("full load", load_full), ("streaming", load_streaming)]
+    if xlrd_can_read_xlsx():
+        loaders.insert(0, ("xlrd", load_xlrd))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.xlsx")
+        write_xlsx(path, num_rows)
+        print("%12s %10s %14s %10s" % ("loader", "time (s)", "peak mem (MB)", "items"))
+        for name, fn in loaders:
+            duration, peak, num_items = measure(fn, path)
+            print("%12s %10.2f %14.1f %10s" % (name, duration, peak / 1e6, num_items))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Peak memory and time of writing a diff report table to XLSX as the report grows.
+
+"per cell" is the old report_to_xlsx (regular workbook, one fill per cell). "write-only" is rows_to_xlsx
+streaming from a generator.
+
+Run from the repository root:
+    python -m benchmarks.bench_xlsx_writer
+"""
+import os
+import tempfile
+import time
+import tracemalloc
+
+import openpyxl
+
+from bom.bom import TableColors
+from helpers.xlsx_converter import code_to_fill, rows_to_xlsx
+
+SIZES = (10000, 50000, 100000)
+LABELS = ["#", "Item Code", "Description", "Qty", "Rev", "Item Code", "Description", "Qty", "Rev"]
+COLORS = [TableColors.BLANK] + [TableColors.LEFT_MATCH] * 4 + [TableColors.RIGHT_MATCH] * 4
+
+
+def iter_rows(num_rows):
+    yield [""] * len(LABELS), [TableColors.TITLE] * len(LABELS)
+    yield LABELS, [TableColors.TITLE] * len(LABELS)
+    for index in range(num_rows):
+        code = "PRT-%s" % (100000 + index)
+        yield [str(index), code, "part %s" % index, 1, "01", code, "part %s" % index, 1, "01"], COLORS
+
+
+def write_per_cell(path, num_rows):
+    workbook = openpyxl.Workbook()
+    worksheet = workbook.active
+    for row_index, (row, colors) in enumerate(iter_rows(num_rows)):
+        for col_index in range(len(row)):
+            cell = worksheet.cell(row=row_index + 1, column=col_index + 1)
+            cell.value = row[col_index]
+            cell.fill = code_to_fill[colors[col_index]]
+    workbook.save(path)
+
+
+def write_streaming(path, num_rows):
+    rows_to_xlsx(iter_rows(num_rows), "Diff", path=path)
+
+
+def measure(fn, path, num_rows):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn(path, num_rows)
+    duration = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duration, peak
+
+
+def main():
+    print("%10s %12s %10s %14s" % ("rows", "writer", "time (s)", "peak mem (MB)"))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.xlsx")
+        for num_rows in SIZES:
+            for name, fn in (("per cell", write_per_cell), ("write-only", write_streaming)):
+                duration, peak = measure(fn, path, num_rows)
+                print("%10s %12s %10.2f %14.1f" % (num_rows, name, duration, peak / 1e6))
+
+
+if __name__ == "__main__":
+    main()
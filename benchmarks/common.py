@@ -0,0 +1,57 @@
+import csv
+import time
+
+from item.common_filters import create_filters_from_config
+from ui.config import FilterConfig
+
+# a filter config close to what a Propel/Solidworks settings.yaml ends up with
+DEFAULT_FILTERS = {
+    "description": FilterConfig(filters=["Description"], type="str"),
+    "quantity": FilterConfig(filters=["__is_qty__", "QTY.", "Quantity"], type="convert_qty"),
+    "propel_number": FilterConfig(
+        filters=["PART NUMBER", "Item Number", "PropelPN", "Item"],
+        type="code_or_number",
+        is_critical=True,
+        equivalent_to=["item_code", "item_id"],
+    ),
+    "item_code": FilterConfig(filters=["Item Code"], type="str"),
+    "item_id": FilterConfig(filters=["Item ID"], type="str"),
+    "category": FilterConfig(filters=["Category Name", "CAT", "Category"], type="convert_cat"),
+    "revision": FilterConfig(filters=["Revision", "Rev"], type="convert_rev"),
+}
+
+
+def setup_filters(filters=None):
+    if filters is None:
+        filters = DEFAULT_FILTERS
+    for name, config_filter in filters.items():
+        config_filter.name = name
+    create_filters_from_config(filters)
+
+
+def best_of(fn, repeat=3):
+    # returns the fastest wall clock time of fn() in seconds
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        duration = time.perf_counter() - t0
+        if best is None or duration < best:
+            best = duration
+    return best
+
+
+def load_bom(bom_cls, path, diff_props):
+    bom = bom_cls.from_file(path)
+    bom.set_diff_props(diff_props)
+    return bom
+
+
+def edit_parts(path, rows):
+    # appends to the descriptions of the parts on rows of a CSV BOM written by bench_item_memory.write_boms
+    with open(path, newline="") as file:
+        lines = list(csv.reader(file))
+    for row in rows:
+        lines[row][2] += " (edited)"
+    with open(path, "w", newline="") as file:
+        csv.writer(file).writerows(lines)
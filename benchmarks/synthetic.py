@@ -0,0 +1,190 @@
+"""
+Synthetic structured BOM pairs in the layout each structured BOM type reads, for benchmarks.
+
+A generated part is (tree number, level, number, description, quantity, category, revision). The left BOM is a tree
+of parts. The right BOM is the same tree with some parts edited and some part numbers swapped for aliases, which the
+equivalence table maps back.
+"""
+import csv
+import os
+import random
+
+import openpyxl
+
+# how the diff attributes are named differs per layout. Names a layout doesn't have are skipped by the diff
+DIFF_PROPS = ["description", "name", "quantity", "revision"]
+
+
+def iter_tree_rows(num_rows, fan_out=10, max_depth=4):
+    # (tree number, level) in depth first order. Assemblies have fan_out children, down to max_depth levels.
+    # The number of top level assemblies grows until there are enough rows
+    count = 0
+    top_level = 0
+    while True:
+        top_level += 1
+        stack = [[top_level]]
+        while len(stack) > 0:
+            num = stack.pop()
+            yield ".".join(map(str, num)), len(num)
+            count += 1
+            if count == num_rows:
+                return
+            if len(num) < max_depth:
+                for index in range(fan_out, 0, -1):
+                    stack.append(num + [index])
+
+
+class BomSpec:
+    """
+    Shape of a synthetic BOM pair:
+        num_rows         parts in each BOM
+        max_depth        levels in the tree. Parts above the bottom level are assemblies
+        fan_out          children per assembly
+        duplicate_rate   fraction of bottom level parts that reuse an earlier one, number and all, like a screw
+                         used in many assemblies
+        num_equivalents  part numbers that are aliased on the right, and so entries in the equivalence table
+        change_rate      fraction of parts whose description or quantity is edited on the right
+    """
+
+    def __init__(
+        self,
+        num_rows=20000,
+        max_depth=6,
+        fan_out=5,
+        duplicate_rate=0.1,
+        num_equivalents=100,
+        change_rate=0.01,
+        seed=0,
+    ):
+        self.num_rows = num_rows
+        self.max_depth = max_depth
+        self.fan_out = fan_out
+        self.duplicate_rate = duplicate_rate
+        self.num_equivalents = num_equivalents
+        self.change_rate = change_rate
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+def generate_parts(spec):
+    """
+    Returns (left parts, right parts, aliases), where aliases maps the part numbers swapped on the right to the
+    numbers used instead.
+    """
+    rnd = random.Random(spec.seed)
+    left_parts = []
+    bottom_level_parts = []
+    for index, (tree_num, level) in enumerate(
+        iter_tree_rows(spec.num_rows, spec.fan_out, spec.max_depth)
+    ):
+        if level < spec.max_depth:
+            fields = _new_part(index, "ASM")
+        elif len(bottom_level_parts) > 0 and rnd.random() < spec.duplicate_rate:
+            fields = bottom_level_parts[rnd.randrange(len(bottom_level_parts))]
+        else:
+            fields = _new_part(index, "PRT")
+            bottom_level_parts.append(fields)
+        left_parts.append((tree_num, level) + fields)
+
+    numbers = sorted(set(part[2] for part in left_parts))
+    aliased = rnd.sample(numbers, min(spec.num_equivalents, len(numbers)))
+    aliases = {number: "A" + number for number in aliased}
+
+    right_parts = []
+    for part in left_parts:
+        tree_num, level, number, description, quantity, category, revision = part
+        number = aliases.get(number, number)
+        if rnd.random() < spec.change_rate:
+            if rnd.random() < 0.5:
+                description += " (rev B)"
+            else:
+                quantity += 1
+        right_parts.append((tree_num, level, number, description, quantity, category, revision))
+    return left_parts, right_parts, aliases
+
+
+def _new_part(index, category):
+    number = str(100000 + index)
+    return number, "part %s" % number, 1 + index % 4, category, 1 + index % 3
+
+
+def _item_code(number, category):
+    return "%s-%s" % (category, number)
+
+
+def _solidworks_row(part):
+    tree_num, level, number, description, quantity, category, revision = part
+    return [tree_num, number, description, quantity, category, revision]
+
+
+def _propel_row(part):
+    tree_num, level, number, description, quantity, category, revision = part
+    return [level, number, description, quantity, category, revision]
+
+
+def _onshape_row(part):
+    tree_num, level, number, description, quantity, category, revision = part
+    return [tree_num, _item_code(number, category), description, quantity, category, revision]
+
+
+# BOM type name, as in bom.STRUCTURED_BOM_TYPES -> (header, part -> row, primary prop)
+LAYOUTS = {
+    "solidworks": (
+        ["ITEM NO.", "PART NUMBER", "Description", "QTY.", "Category", "Revision"],
+        _solidworks_row,
+        "propel_number",
+    ),
+    "propel": (
+        ["level", "Item Number", "Description", "Quantity", "Category Name", "Revision"],
+        _propel_row,
+        "propel_number",
+    ),
+    "onshape": (
+        ["Item", "Item Code", "Name", "Quantity", "Category", "Revision"],
+        _onshape_row,
+        "item_code",
+    ),
+}
+FORMATS = ("csv", "xlsx")
+
+
+def equivalent_items(layout, parts, aliases):
+    # the equivalence table for aliases, in the layout's primary values
+    primary_prop = LAYOUTS[layout][2]
+    categories = {part[2]: part[5] for part in parts}
+    table = []
+    for number, alias in aliases.items():
+        if primary_prop == "item_code":
+            category = categories[number]
+            table.append([_item_code(number, category), _item_code(alias, category)])
+        else:
+            table.append([number, alias])
+    return table
+
+
+def write_bom(path, layout, parts):
+    # written as CSV or XLSX, going by the extension of path
+    header, row_fn, _ = LAYOUTS[layout]
+    if path.endswith(".xlsx"):
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet("BOM")
+        sheet.append(header)
+        for part in parts:
+            sheet.append(row_fn(part))
+        workbook.save(path)
+    else:
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            for part in parts:
+                writer.writerow(row_fn(part))
+
+
+def write_bom_pair(directory, layout, file_format, left_parts, right_parts):
+    left_path = os.path.join(directory, "%s-left.%s" % (layout, file_format))
+    right_path = os.path.join(directory, "%s-right.%s" % (layout, file_format))
+    write_bom(left_path, layout, left_parts)
+    write_bom(right_path, layout, right_parts)
+    return left_path, right_path
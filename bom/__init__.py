@@ -2,4 +2,9 @@ from .bom import BOM
 from .onshape_bom import OnshapeBOM, OnshapeStructured
 from .propel_bom import PropelBOM, PropelStructured
 from .solidworks_bom import SolidworksBOM, SolidworksStructured
-from .structured_bom import StructuredBOM
+from .structured_bom import EXTENDED_QUANTITIES, FLATTEN_MODES, RAW_QUANTITIES, StructuredBOM
+from .bom_types import FLAT_BOM_TYPES, STRUCTURED_BOM_TYPES
+from .bom_cache import BomCache
+from .bom_loader import BomLoader, load_bom, load_boms
+from .bom_columns import BomColumns, DiffMask
+from .incremental_diff import IncrementalDiff
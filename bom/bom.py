@@ -1,17 +1,13 @@
-import csv
 import os
 
-import xlrd
-
-from item import (
-    CODE_CATEGORIES,
-    CODE_CATEGORIES_LOWER,
-    NAME_CATEGORIES,
-    NAME_CATEGORIES_LOWER,
-)
+from item import get_category_tables
+import metrics
 from item.item import Item
 from logger import LoggerManager
 
+from .bom_columns import BomColumns, resolve_diff_names
+from .file_readers import iter_csv_rows, iter_xlsx_rows
+
 logger = LoggerManager.get_logger()
 
 
@@ -20,13 +16,22 @@ class BOM:
         self.name = name
         self.items = []
         self.items_set = set()
+
+        # canonical key -> item. When a key repeats, the first item appended keeps the slot,
+        # the same item items_set holds on to
+        self.items_by_key = {}
         self.header = {}
+        self._header_plan = None
         self.item_diff_names = ["Item Code", "Description", "Qty"]
 
         # items that show on the diff report but aren't necessarily compared against each other
         self.item_show_names = ["Item Code", "Description", "Qty", "Revision"]
         self.ignored_categories = []
 
+        # compare matched items column by column instead of one Item.diff per pair
+        self.columnar_diff = False
+        self._columns = None
+
     def create_header(self, header):
         return {key: index for index, key in enumerate(header)}
 
@@ -36,57 +41,52 @@ class BOM:
             # if item in self.items_set:
             #     logger.warn("item is listed twice in %s: %s" % (self.name, item))
             self.items_set.add(item)
+            self.items_by_key.setdefault(item.get_key(), item)
+            self._columns = None
 
     @classmethod
-    def from_file(cls, path):
+    def from_file(cls, path, sheet_name=None):
         if path.endswith(".csv"):
             return cls.from_csv(path)
         elif path.endswith(".xlsx"):
-            return cls.from_xlsx(path)
+            return cls.from_xlsx(path, sheet_name)
         else:
             raise NotImplementedError("Unsupported file type: %s" % path)
 
     @classmethod
-    def from_xlsx(cls, path):
+    def from_xlsx(cls, path, sheet_name=None):
         obj = cls(os.path.basename(path))
-        workbook = xlrd.open_workbook(path)
-        sheet = workbook.sheet_by_index(0)
-
-        obj.header = obj.create_header(sheet.row_values(0))
-        obj.header = {str(key): value for key, value in obj.header.items()}
-        for row_num in range(1, sheet.nrows):
-            line = sheet.row_values(row_num)
-            item = obj.create_item(line)
-            obj.append(item)
+        rows = iter_xlsx_rows(path, sheet_name)
+        try:
+            first_row = next(rows, None)
+            if first_row is None:
+                raise ValueError("%s doesn't have a header row" % path)
+            obj.header = obj.create_header(first_row)
+            obj.header = {str(key): value for key, value in obj.header.items()}
+            obj._append_rows(rows)
+        finally:
+            rows.close()
         return obj
 
     @classmethod
     def from_csv(cls, path):
         obj = cls(os.path.basename(path))
-        file, reader, first_row = obj._attempt_to_open(path)
+        rows = iter_csv_rows(path)
+        first_row = next(rows, None)
+        if first_row is None:
+            raise ValueError("%s doesn't have a header row" % path)
         obj.header = obj.create_header(first_row)
-        for line in reader:
-            item = obj.create_item(line)
-            obj.append(item)
-        file.close()
+        obj._append_rows(rows)
         return obj
 
-    def _attempt_to_open(self, path):
-        encoding_attempts = ["utf-8", None, "utf-16", "cp1252"]
-        exception = None
-        for encoding in encoding_attempts:
-            file = None
-            try:
-                file = open(path, encoding=encoding)
-                reader = csv.reader(file)
-                first_row = next(reader)
-                return file, reader, first_row
-            except BaseException as e:
-                if file is not None:
-                    file.close()
-                exception = e
-        if exception is not None:
-            raise exception
+    def _append_rows(self, rows):
+        num_rows = 0
+        with metrics.span("parse rows"):
+            for line in rows:
+                item = self.create_item(line)
+                self.append(item)
+                num_rows += 1
+        metrics.count("rows parsed", num_rows)
 
     @classmethod
     def from_list(cls, name, l, header=None):
@@ -98,8 +98,18 @@ class BOM:
             obj.append(obj.recreate_item(item, header))
         return obj
 
+    def get_header_plan(self, item_cls):
+        # header resolution is shared by every row of the file
+        plan = self._header_plan
+        if plan is None or not plan.is_valid_for(
+            item_cls, self.header, item_cls.item_primary_prop
+        ):
+            plan = item_cls.compile_header(self.header)
+            self._header_plan = plan
+        return plan
+
     def create_item(self, line):
-        return Item.from_line(self.header, line)
+        return Item.from_line(self.header, line, plan=self.get_header_plan(Item))
 
     def recreate_item(self, item, header=None):
         return Item.from_item(item, header)
@@ -127,59 +137,85 @@ class BOM:
             if name not in self.item_show_names:
                 self.item_show_names.insert(index, name)
 
+    def set_columnar_diff(self, enabled):
+        self.columnar_diff = enabled
+
+    def get_columns(self):
+        # built on first use and dropped whenever an item is appended or a quantity added
+        if self._columns is None:
+            self._columns = BomColumns(self.items)
+        return self._columns
+
+    def get_diff_attr_names(self, other):
+        # the attributes item_diff_names resolve to when items of self are compared with items of other
+        lookups = [bom.items[0].get_filter_lookup() if len(bom.items) > 0 else None for bom in (self, other)]
+        return resolve_diff_names(lookups[0], lookups[1], self.item_diff_names)
+
+    def diff_items(self, other, self_items, other_items):
+        """
+        The differing attributes of each (self item, other item) pair: a list of attribute names per pair, or a
+        DiffMask over all the pairs when columnar_diff is set. Either can be sliced and goes in a diff report.
+        """
+        if self.columnar_diff:
+            self_columns = self.get_columns()
+            other_columns = other.get_columns()
+            return self_columns.diff(
+                other_columns,
+                self_columns.rows_of(self_items),
+                other_columns.rows_of(other_items),
+                self.item_diff_names,
+            )
+        return [
+            self_item.diff(other_item, self.item_diff_names)
+            for self_item, other_item in zip(self_items, other_items)
+        ]
+
     def set_ignored_categories(self, categories: list):
+        # replaces the ignored categories, so settings can be applied to the same BOM again
+        tables = get_category_tables()
+        ignored_categories = []
         for category in categories:
             category = category.lower()
-            if category in NAME_CATEGORIES_LOWER:
-                # NAME_CATEGORIES_LOWER maps to normal case category names
-                # NAME_CATEGORIES maps to category codes
-                category = NAME_CATEGORIES[NAME_CATEGORIES_LOWER[category]]
-            if category in CODE_CATEGORIES_LOWER:
-                category = CODE_CATEGORIES_LOWER[category]
-            if category not in CODE_CATEGORIES:
+            if category in tables.name_lower:
+                # name_lower maps to normal case category names
+                # name maps to category codes
+                category = tables.name[tables.name_lower[category]]
+            if category in tables.code_lower:
+                category = tables.code_lower[category]
+            if category not in tables.code:
                 continue
-            self.ignored_categories.append(category)
+            ignored_categories.append(category)
+        self.ignored_categories = ignored_categories
 
     def diff(self, other):
         assert isinstance(other, BOM)
 
+        # both sides are matched through items_by_key, so for a repeated key the first item of
+        # each BOM is the one that gets compared and reported
+        self_index = self.items_by_key
+        other_index = other.items_by_key
+
+        # common items are sorted on the representative of the smaller BOM (other's on a tie)
+        if len(other_index) > len(self_index):
+            common_parts = [item for key, item in self_index.items() if key in other_index]
+        else:
+            common_parts = [item for key, item in other_index.items() if key in self_index]
+        common_parts.sort()
+
         common_parts_self = []
         common_parts_other = []
-        common_parts_diff_attrs = []
-        item_ids = [id(x) for x in self.items]
-        other_ids = [id(x) for x in other.items]
-        for item in sorted(self.items_set.intersection(other.items_set)):
-            if id(item) in item_ids:
-                index = other.items.index(item)
-                other_item = other.items[index]
-                common_parts_self.append(item)
-                common_parts_other.append(other_item)
-            elif id(item) in other_ids:
-                index = self.items.index(item)
-                other_item = self.items[index]
-                common_parts_other.append(item)
-                common_parts_self.append(other_item)
-            else:
-                common_parts_diff_attrs.append([])
-                continue
-            common_parts_diff_attrs.append(item.diff(other_item, self.item_diff_names))
-
-        assert (
-            len(common_parts_self)
-            == len(common_parts_other)
-            == len(common_parts_diff_attrs)
+        for item in common_parts:
+            key = item.get_key()
+            common_parts_self.append(self_index[key])
+            common_parts_other.append(other_index[key])
+        common_parts_diff_attrs = self.diff_items(
+            other, common_parts_self, common_parts_other
         )
-        # common_parts_self.sort()
-        # common_parts_other.sort()
 
-        self_only = []
-        for item in self.items_set.difference(other.items_set):
-            self_only.append(item)
+        self_only = [item for key, item in self_index.items() if key not in other_index]
         self_only.sort()
 
-        other_only = []
-        for item in other.items_set.difference(self.items_set):
-            other_only.append(item)
+        other_only = [item for key, item in other_index.items() if key not in self_index]
         other_only.sort()
 
         diff_report = (
@@ -247,35 +283,37 @@ class BOM:
         return report_str
 
     def diff_report_to_table(self, diff_report, other, show_common=False):
+        report = []
+        color_mapping = []
+        for row, color_row in self.iter_diff_report_table(
+            diff_report, other, show_common
+        ):
+            report.append(row)
+            color_mapping.append(color_row)
+        return report, color_mapping
+
+    def iter_diff_report_table(self, diff_report, other, show_common=False):
+        # yields (row, color row) pairs so writers can stream the table instead of holding all of it
         header_length = 1 + len(self.item_show_names) * 2
         first_row = ["", "%s (%s)" % (self.name, len(self.items))]
         for _ in range(len(self.item_show_names)):
             first_row.append("")
         first_row.append("%s (%s)" % (other.name, len(other.items)))
         self._fill_to_length(first_row, header_length)
-        report = [first_row]
-        color_mapping = [[TableColors.TITLE for _ in range(len(first_row))]]
+        yield first_row, [TableColors.TITLE for _ in range(len(first_row))]
 
         second_row = ["#"] + self.item_show_names + self.item_show_names
         self._fill_to_length(second_row, header_length)
-        color_mapping.append([TableColors.TITLE for _ in range(len(second_row))])
-        report.append(second_row)
+        yield second_row, [TableColors.TITLE for _ in range(len(second_row))]
 
-        no_differences = self._diff_toplevel_to_table(
-            diff_report, show_common, report, color_mapping
-        )
+        no_differences = yield from self._iter_toplevel_table(diff_report, show_common)
         if no_differences:
             bom_match_row = ["", "BOMs match for %s" % self.name]
             self._fill_to_length(bom_match_row, header_length)
-            report.append(bom_match_row)
-            color_mapping.append([TableColors.BLANK for _ in range(len(bom_match_row))])
-        return report, color_mapping
+            yield bom_match_row, [TableColors.BLANK for _ in range(len(bom_match_row))]
 
     def _get_attr_from_name(self, item, name):
-        header_filter_match = item.get_header_filter_match(name)
-        if header_filter_match is None:
-            return None
-        return header_filter_match.attribute_name
+        return item.get_filter_lookup().get_attribute_name(name)
 
     def _append_common_diff_rows(
         self, item, diff_attrs, row, color_row, diff_color, match_color, show_color
@@ -317,9 +355,8 @@ class BOM:
         row.append(item.tree_num if hasattr(item, "tree_num") else "")
         color_row.append(TableColors.BLANK)
 
-    def _diff_toplevel_to_table(
-        self, diff_report, show_common, report: list, color_mapping: list
-    ):
+    def _iter_toplevel_table(self, diff_report, show_common):
+        # yields the table rows of one level of a diff report and returns whether that level matched
         common_parts_self = diff_report[0]
         common_parts_other = diff_report[1]
         common_parts_diff_attrs = diff_report[2]
@@ -354,8 +391,7 @@ class BOM:
                     TableColors.RIGHT_MATCH,
                     TableColors.RIGHT_SHOW,
                 )
-                report.append(row)
-                color_mapping.append(color_row)
+                yield row, color_row
 
         for subitem in self_only:
             no_differences = False
@@ -366,8 +402,7 @@ class BOM:
             self._append_only_diff_rows(subitem, row, color_row, TableColors.LEFT_DIFF)
             self._append_only_empty_diff_rows(row, color_row, TableColors.LEFT_DIFF)
 
-            report.append(row)
-            color_mapping.append(color_row)
+            yield row, color_row
         for subitem in other_only:
             no_differences = False
             row = []
@@ -377,17 +412,18 @@ class BOM:
             self._append_only_empty_diff_rows(row, color_row, TableColors.RIGHT_DIFF)
             self._append_only_diff_rows(subitem, row, color_row, TableColors.RIGHT_DIFF)
 
-            report.append(row)
-            color_mapping.append(color_row)
+            yield row, color_row
 
         return no_differences
 
     def extend(self, other, add_quantities=True):
         for other_item in other.items:
-            if other_item in self.items_set:
+            self_item = self.items_by_key.get(other_item.get_key())
+            if self_item is not None:
                 if add_quantities:
-                    index = self.items.index(other_item)
-                    self.items[index].quantity += other_item.quantity
+                    self_item.quantity += other_item.quantity
+                    # the quantity column is out of date
+                    self._columns = None
             else:
                 self.append(other_item)
 
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+import metrics
+from item.item_settings import ItemSettings
+from logger import LoggerManager
+
+logger = LoggerManager.get_logger()
+
+# bump whenever BOM or item attributes change so entries pickled by older code are never loaded
+CACHE_FORMAT = 6
+ENTRY_EXTENSION = ".bom"
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BomCache:
+    """
+    On-disk cache of parsed BOMs. An entry is keyed by the file's content, the BOM class, the sheet name and the
+    item settings fingerprint, so editing the file or the settings just misses instead of returning stale items.
+    Entries are pickles. Least recently used entries are evicted once the cache grows past max_bytes.
+
+    Only point this at a directory you trust: entries are unpickled.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+
+    def get_key(self, bom_cls, path, sheet_name=None, settings=None):
+        if settings is None:
+            settings = ItemSettings.capture()
+        key = (
+            CACHE_FORMAT,
+            hash_file(path),
+            "%s.%s" % (bom_cls.__module__, bom_cls.__qualname__),
+            sheet_name,
+            settings.fingerprint(),
+        )
+        return hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, key + ENTRY_EXTENSION)
+
+    def get(self, key):
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "rb") as file:
+                bom = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # unreadable or written by incompatible code. Drop it and parse again
+            logger.warning("Discarding BOM cache entry %s: %s" % (entry_path, str(e)))
+            self._remove(entry_path)
+            return None
+
+        # the modification time doubles as the last access time for eviction
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return bom
+
+    def put(self, key, bom):
+        os.makedirs(self.directory, exist_ok=True)
+        # written to a temporary file first so other processes never see a partial entry
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                pickle.dump(bom, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._entry_path(key))
+        except BaseException:
+            self._remove(temp_path)
+            raise
+        self.evict()
+
+    def load(self, bom_cls, path, sheet_name=None):
+        """
+        bom_cls.from_file(path, sheet_name), from the cache when possible
+        """
+        key = self.get_key(bom_cls, path, sheet_name)
+        bom = self.get(key)
+        if bom is not None:
+            logger.debug("BOM cache hit for %s" % path)
+            metrics.count("BOMs from cache")
+            return bom
+
+        logger.debug("BOM cache miss for %s" % path)
+        bom = bom_cls.from_file(path, sheet_name)
+        try:
+            self.put(key, bom)
+        except OSError as e:
+            logger.warning("Couldn't cache %s: %s" % (path, str(e)))
+        return bom
+
+    def invalidate(self, bom_cls, path, sheet_name=None):
+        # drops the entry for the file as it is now, with the current settings
+        self._remove(self._entry_path(self.get_key(bom_cls, path, sheet_name)))
+
+    def clear(self):
+        for entry_path, _, _ in self._entries():
+            self._remove(entry_path)
+
+    def size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        entries.sort(key=lambda entry: entry[2])
+        for entry_path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            logger.debug("Evicting BOM cache entry %s" % entry_path)
+            self._remove(entry_path)
+            total -= size
+
+    def _entries(self):
+        # [(path, size, last access), ...]
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if not name.endswith(ENTRY_EXTENSION):
+                continue
+            entry_path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(entry_path)
+            except FileNotFoundError:
+                continue  # removed by another process
+            entries.append((entry_path, stat.st_size, stat.st_mtime))
+        return entries
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,210 @@
+import operator
+import sys
+from array import array
+
+# stands in for an attribute an item doesn't have
+_MISSING = object()
+
+
+def _intern(value):
+    if type(value) == str:
+        return sys.intern(value)
+    return value
+
+
+def _get_values(items, attr_name):
+    # (values, whether some item doesn't have the attribute)
+    try:
+        return list(map(operator.attrgetter(attr_name), items)), False
+    except AttributeError:
+        return [getattr(item, attr_name, _MISSING) for item in items], True
+
+
+def _take(column, rows):
+    # column values at rows, in order
+    if len(rows) == 0:
+        return []
+    if len(rows) == 1:
+        return [column[rows[0]]]
+    return operator.itemgetter(*rows)(column)
+
+
+def _raise_missing(items, attr_name):
+    for item in items:
+        getattr(item, attr_name)  # raises the same AttributeError Item.diff would
+
+
+class BomColumns:
+    """
+    Column oriented view of a list of items: one array per attribute, with rows in item order.
+    Columns are built the first time they're asked for. Quantities that are all integers go in an integer array,
+    everything else in a list with strings interned, so comparing two columns is mostly identity checks.
+    Rows can be looked up by item or by item key (the first item with a key wins, like BOM.items_by_key).
+    The view doesn't follow changes to the items. Build a new one after editing them.
+    """
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.row_by_item = dict(zip(map(id, self.items), range(len(self.items))))
+        self._row_by_key = None
+        self.columns = {}
+
+        # attribute name -> whether some item doesn't have it
+        self.missing = {}
+
+    def get_lookup(self):
+        # every item of a BOM is the same class, so they all resolve names the same way
+        if len(self.items) == 0:
+            return None
+        return self.items[0].get_filter_lookup()
+
+    def get_row_by_key(self):
+        if self._row_by_key is None:
+            row_by_key = {}
+            for row, item in enumerate(self.items):
+                row_by_key.setdefault(item.get_key(), row)
+            self._row_by_key = row_by_key
+        return self._row_by_key
+
+    def column(self, attr_name):
+        column = self.columns.get(attr_name)
+        if column is None:
+            values, self.missing[attr_name] = _get_values(self.items, attr_name)
+            value_types = set(map(type, values))
+            if value_types == {int}:
+                try:
+                    column = array("q", values)
+                except OverflowError:
+                    column = values
+            elif value_types == {str}:
+                column = list(map(sys.intern, values))
+            else:
+                column = list(map(_intern, values))
+            self.columns[attr_name] = column
+        return column
+
+    def rows_of(self, items):
+        row_by_item = self.row_by_item
+        return [row_by_item[id(item)] for item in items]
+
+    def diff(self, other, self_rows, other_rows, diff_names):
+        """
+        Compares the pairs (self row, other row) on the attributes diff_names resolve to, the way Item.diff does
+        for one pair. Returns a DiffMask.
+        """
+        assert len(self_rows) == len(other_rows), "%s != %s" % (len(self_rows), len(other_rows))
+        attr_names = resolve_diff_names(self.get_lookup(), other.get_lookup(), diff_names)
+
+        masks = {}
+        for attr_name in attr_names:
+            if attr_name in masks:
+                continue
+            self_values = _take(self.column(attr_name), self_rows)
+            other_values = _take(other.column(attr_name), other_rows)
+            if self.missing[attr_name] and _MISSING in self_values:
+                _raise_missing([self.items[row] for row in self_rows], attr_name)
+            if other.missing[attr_name] and _MISSING in other_values:
+                _raise_missing([other.items[row] for row in other_rows], attr_name)
+            masks[attr_name] = bytearray(map(operator.ne, self_values, other_values))
+        return DiffMask(attr_names, masks, len(self_rows))
+
+
+def resolve_diff_names(lookup, other_lookup, diff_names):
+    # attribute names compared for diff_names, in order. Same rules as Item.diff
+    attr_names = []
+    for name in diff_names:
+        header_filter_match = None if lookup is None else lookup.match(name)
+        other_header_filter_match = None if other_lookup is None else other_lookup.match(name)
+        if header_filter_match is None and other_header_filter_match is None:
+            continue
+        if header_filter_match is not None and other_header_filter_match is not None:
+            assert (
+                header_filter_match.attribute_name == other_header_filter_match.attribute_name
+            ), "%s != %s" % (
+                header_filter_match.attribute_name,
+                other_header_filter_match.attribute_name,
+            )
+        matched_filter = header_filter_match or other_header_filter_match
+        attr_names.append(matched_filter.attribute_name)
+    return attr_names
+
+
+class DiffMask:
+    """
+    Which attributes differ for each compared pair: masks[attr_name][pair] is 1 where they differ.
+    Indexing or iterating gives a DiffMaskRow per pair, which stands in for the list of differing attribute names
+    Item.diff returns, so a mask can go anywhere a diff report expects those lists.
+    Slicing (or view(start, stop)) shares the masks of a range of pairs instead of copying them.
+    """
+
+    def __init__(self, attr_names, masks, num_pairs, start=0):
+        self.attr_names = attr_names
+        self.masks = masks
+        self.start = start
+        self.num_pairs = num_pairs
+
+    def view(self, start, stop):
+        return DiffMask(self.attr_names, self.masks, stop - start, self.start + start)
+
+    def differs(self, pair, attr_name):
+        mask = self.masks.get(attr_name)
+        return mask is not None and mask[self.start + pair] != 0
+
+    def any_differs(self, pair):
+        pair += self.start
+        for mask in self.masks.values():
+            if mask[pair]:
+                return True
+        return False
+
+    def diff_attrs(self, pair):
+        pair += self.start
+        return [name for name in self.attr_names if self.masks[name][pair]]
+
+    def __len__(self):
+        return self.num_pairs
+
+    def __getitem__(self, pair):
+        if isinstance(pair, slice):
+            start, stop, step = pair.indices(self.num_pairs)
+            assert step == 1, "DiffMask slices can't have a step"
+            return self.view(start, max(start, stop))
+        if pair < 0:
+            pair += self.num_pairs
+        if not 0 <= pair < self.num_pairs:
+            raise IndexError("DiffMask index out of range")
+        return DiffMaskRow(self, pair)
+
+    def __iter__(self):
+        for pair in range(self.num_pairs):
+            yield DiffMaskRow(self, pair)
+
+
+class DiffMaskRow:
+    """
+    One pair of a DiffMask. Supports len(), in and iteration like a list of differing attribute names.
+    """
+
+    __slots__ = ("mask", "pair")
+
+    def __init__(self, mask, pair):
+        self.mask = mask
+        self.pair = pair
+
+    def __contains__(self, attr_name):
+        return self.mask.differs(self.pair, attr_name)
+
+    def __len__(self):
+        return len(self.mask.diff_attrs(self.pair))
+
+    def __bool__(self):
+        return self.mask.any_differs(self.pair)
+
+    def __iter__(self):
+        return iter(self.mask.diff_attrs(self.pair))
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(self.mask.diff_attrs(self.pair))
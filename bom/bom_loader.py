@@ -0,0 +1,90 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from item.item_settings import ItemSettings
+from logger import LoggerManager
+
+logger = LoggerManager.get_logger()
+
+
+def _install_settings(settings, log_config):
+    LoggerManager.configure(**log_config)
+    settings.install()
+
+
+def load_bom(bom_cls, path, cache=None):
+    if cache is None:
+        return bom_cls.from_file(path)
+    return cache.load(bom_cls, path)
+
+
+class BomLoader:
+    """
+    Parses BOM files in a pool of worker processes so independent files load at the same time.
+    Every worker gets a snapshot of this process' item settings, taken when the loader is created.
+    BOMs come back pickled, so the parent receives its own copies.
+    With a BomCache, BOMs already in the cache are loaded here rather than round tripping through a worker, and
+    workers add the ones they parse.
+
+    with BomLoader() as loader:
+        right = loader.submit(PropelStructured, right_path)
+        left_bom = SolidworksStructured.from_file(left_path)  # meanwhile, in this process
+        right_bom = right.result()
+    """
+
+    def __init__(self, max_workers=1, settings=None, cache=None):
+        if settings is None:
+            settings = ItemSettings.capture()
+        self.cache = cache
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_install_settings,
+            initargs=(settings, LoggerManager.get_config()),
+        )
+        self.futures = []
+
+    def submit(self, bom_cls, path):
+        if self.cache is not None:
+            bom = self.cache.get(self.cache.get_key(bom_cls, path))
+            if bom is not None:
+                logger.debug("BOM cache hit for %s" % path)
+                future = Future()
+                future.set_result(bom)
+                return future
+        future = self.executor.submit(load_bom, bom_cls, path, self.cache)
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, wait=True):
+        # with wait=False, loads that haven't started are cancelled. The ones that already started finish in the
+        # background and their results are dropped.
+        # cancelled by hand because shutdown(cancel_futures=True) needs python 3.9
+        if not wait:
+            for future in self.futures:
+                future.cancel()
+        self.executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown(wait=exc_type is None)
+        return False
+
+
+def load_boms(sources, settings=None, cache=None):
+    """
+    sources is a list of (BOM class, path) pairs. Returns the loaded BOMs in the same order.
+    The first BOM is parsed in this process while the rest load in worker processes, so only those pay for
+    being pickled back.
+    """
+    if len(sources) == 0:
+        return []
+    (first_cls, first_path), others = sources[0], sources[1:]
+    if len(others) == 0:
+        return [load_bom(first_cls, first_path, cache)]
+
+    with BomLoader(len(others), settings, cache) as loader:
+        futures = [loader.submit(bom_cls, path) for bom_cls, path in others]
+        boms = [load_bom(first_cls, first_path, cache)]
+        boms.extend(future.result() for future in futures)
+    return boms
@@ -0,0 +1,21 @@
+from .onshape_bom import OnshapeBOM, OnshapeStructured
+from .propel_bom import PropelBOM, PropelStructured
+from .solidworks_bom import SolidworksBOM, SolidworksStructured
+from .structured_bom import StructuredBOM
+
+# BOM type name (as shown in the UI and stored in settings) -> class
+
+STRUCTURED_BOM_TYPES = {
+    "solidworks": SolidworksStructured,
+    "propel": PropelStructured,
+    "onshape": OnshapeStructured,
+    "generic": StructuredBOM,
+}
+
+# flat counterparts, used for the assemblies only diff
+FLAT_BOM_TYPES = {
+    "solidworks": SolidworksBOM,
+    "propel": PropelBOM,
+    "onshape": OnshapeBOM,
+    "generic": PropelBOM,
+}
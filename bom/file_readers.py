@@ -0,0 +1,80 @@
+import codecs
+import csv
+import io
+
+
+from logger import LoggerManager
+
+logger = LoggerManager.get_logger()
+
+# utf-32 marks have to be checked before utf-16 since the LE ones share a prefix
+BYTE_ORDER_MARKS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+# tried in order when there's no byte order mark. latin-1 accepts any byte so it always succeeds
+FALLBACK_ENCODINGS = ("utf-8", "cp1252", "latin-1")
+CSV_DELIMITERS = ",\t;|"
+SNIFF_SIZE = 64 * 1024
+
+
+def decode_bytes(data):
+    for byte_order_mark, encoding in BYTE_ORDER_MARKS:
+        if data.startswith(byte_order_mark):
+            return encoding, data.decode(encoding)
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            return encoding, data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("Failed to detect the encoding")  # unreachable, latin-1 decodes anything
+
+
+def sniff_delimiter(text):
+    sample = text[:SNIFF_SIZE]
+    if len(text) > SNIFF_SIZE and "\n" in sample:
+        sample = sample[: sample.rindex("\n")]  # only sniff whole lines
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        return ","
+
+
+def iter_csv_rows(path):
+    # the file is read once. The encoding is settled over the whole file before any row is parsed
+    # so a bad byte near the end can't fail the parse halfway through
+    with open(path, "rb") as file:
+        data = file.read()
+    encoding, text = decode_bytes(data)
+    del data
+    delimiter = sniff_delimiter(text)
+    logger.debug(
+        "Reading %s as %s with delimiter %s" % (path, encoding, repr(delimiter))
+    )
+    yield from csv.reader(io.StringIO(text, newline=""), delimiter=delimiter)
+
+
+def iter_xlsx_rows(path, sheet_name=None):
+    # read-only workbooks stream rows from the file instead of loading the whole sheet. openpyxl takes a while to
+    # import, so it's only imported once an xlsx file is read
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        if sheet_name is None:
+            sheet = workbook.worksheets[0]
+        elif sheet_name in workbook.sheetnames:
+            sheet = workbook[sheet_name]
+        else:
+            raise ValueError(
+                "Sheet '%s' not found in %s. Available sheets: %s"
+                % (sheet_name, path, ", ".join(workbook.sheetnames))
+            )
+        for row in sheet.iter_rows(values_only=True):
+            # empty cells come back as None. Match what CSV rows contain
+            yield ["" if value is None else value for value in row]
+    finally:
+        workbook.close()
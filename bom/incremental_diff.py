@@ -0,0 +1,188 @@
+import metrics
+from item.item_settings import ItemSettings
+from logger import LoggerManager
+
+from .bom_cache import hash_file
+from .tree_index import TreeIndex
+from .tree_walk import walk_tree
+
+logger = LoggerManager.get_logger()
+
+
+class IncrementalDiff:
+    """
+    Keeps what one structured diff needs for the next one: the parsed BOMs, the digests of their assemblies and the
+    report. Diffing again only matches the assemblies whose digests changed since the last run (on either side),
+    and splices the last report's branches in for the rest, so an edit to one part re-diffs the assemblies above it.
+    The report is the same one StructuredBOM.diff returns.
+    Digests come from hash(), so a session is only good for the process it was made in. Run one diff at a time.
+
+    session = IncrementalDiff()
+    ...  # every run
+    key = session.source_key(SolidworksStructured, left_path)
+    left_bom = session.get_bom(key)
+    if left_bom is None:
+        left_bom = SolidworksStructured.from_file(left_path)
+    ...  # the same for the right BOM
+    session.keep_boms({key: left_bom, right_key: right_bom})
+    diff_report = session.diff(left_bom, right_bom)
+    """
+
+    def __init__(self):
+        # source key -> BOM, for the BOMs of the last run
+        self.boms = {}
+        # id(structured BOM) -> (structured BOM, its flatten mode, its assemblies only BOM), for the last run
+        self.assemblies = {}
+
+        self.left = None
+        self.right = None
+        self.settings = None
+        self.left_digests = None
+        self.right_digests = None
+        self.report = None
+        # parent num -> (other parent num, [branch report, children]) for every branch of the last report
+        self.nodes = None
+
+    @staticmethod
+    def source_key(bom_cls, path):
+        # the file's content and everything it's parsed with, like the BOM cache key
+        return (
+            bom_cls,
+            path,
+            hash_file(path),
+            ItemSettings.capture().fingerprint(),
+        )
+
+    def get_bom(self, source_key):
+        # the BOM parsed from the same source last run, or None
+        return self.boms.get(source_key)
+
+    def keep_boms(self, boms_by_key):
+        # {source key: BOM} used this run. BOMs from earlier runs are let go
+        self.boms = dict(boms_by_key)
+        kept = [id(bom) for bom in self.boms.values()]
+        self.assemblies = {key: entry for key, entry in self.assemblies.items() if key in kept}
+
+    def assemblies_only(self, bom, build_fn):
+        # build_fn(bom) makes the assemblies only BOM, once per structured BOM and flatten mode
+        entry = self.assemblies.get(id(bom))
+        if entry is None or entry[0] is not bom or entry[1] != bom.flatten_mode:
+            entry = (bom, bom.flatten_mode, build_fn(bom))
+            self.assemblies[id(bom)] = entry
+        return entry[2]
+
+    def _get_settings(self, left, right):
+        # everything besides the BOMs themselves that changes the report
+        return (
+            ItemSettings.capture().fingerprint(),
+            tuple(left.item_diff_names),
+            tuple(left.ignored_categories),
+            left.columnar_diff,
+            left.skip_identical_assemblies,
+            type(left),
+            type(right),
+        )
+
+    def diff(self, left, right):
+        """
+        The diff report of left and right, like left.diff(right). Parts of the last report are moved into this one,
+        so a report is only good until the next diff.
+        """
+        settings = self._get_settings(left, right)
+        attr_names = left.get_diff_attr_names(right)
+        same_settings = settings == self.settings
+        left_digests = self._get_digests(left, self.left, self.left_digests, attr_names, same_settings)
+        right_digests = self._get_digests(right, self.right, self.right_digests, attr_names, same_settings)
+
+        reuse = None
+        spliced = set()
+        if self.nodes is not None and same_settings:
+
+            def reuse(parent_num, other_parent_num):
+                if not self._can_reuse(left_digests, right_digests, parent_num, other_parent_num):
+                    return None
+                spliced.add(parent_num)
+                branch_report = self._swap_items(self.nodes[parent_num][1][0], left, right)
+                return [(parent_num, other_parent_num, branch_report)]
+
+        branches = left.diff_branches(right, reuse)
+
+        # the report is built like StructuredBOM.diff_report_from_branches does, except that the branches below a
+        # reused one are moved over from the last report as they are
+        diff_report = {}
+        diff_report_index = TreeIndex()
+        nodes = {}
+        for parent_num, other_parent_num, branch_report in branches:
+            node = diff_report_index.insert(diff_report, parent_num)
+            node[0] = branch_report
+            nodes[parent_num] = (other_parent_num, node)
+            if parent_num in spliced:
+                if len(parent_num) > 0:
+                    node[1] = self.nodes[parent_num][1][1]
+                    subreport = node[1]
+                else:
+                    # the top level branches of a report sit next to "" rather than below it
+                    subreport = {tree_num: branch for tree_num, branch in self.report.items() if tree_num != ""}
+                    diff_report.update(subreport)
+                self._splice(subreport, nodes, left, right)
+        if reuse is not None:
+            metrics.count("subtrees reused", len(spliced))
+            logger.debug(
+                "Diffed %s of %s assemblies, the rest are unchanged since the last run"
+                % (len(branches) - len(spliced), len(nodes))
+            )
+
+        self.left = left
+        self.right = right
+        self.settings = settings
+        self.left_digests = left_digests
+        self.right_digests = right_digests
+        self.report = diff_report
+        self.nodes = nodes
+        return diff_report
+
+    def _get_digests(self, bom, last_bom, last_digests, attr_names, same_settings):
+        # (attr_names, digests). The same BOM is digested once, as long as the settings stay the same
+        if bom is last_bom and same_settings and last_digests[0] == attr_names:
+            return last_digests
+        with metrics.span("subtree digests"):
+            return attr_names, bom.subtree_digests(attr_names)
+
+    def _can_reuse(self, left_digests, right_digests, parent_num, other_parent_num):
+        # whether the last report has this pair of assemblies, and neither side changed below them since
+        entry = self.nodes.get(parent_num)
+        if entry is None or entry[0] != other_parent_num:
+            return False
+        if self.left_digests[0] != left_digests[0]:
+            return False
+        return (
+            left_digests[1].get(parent_num) == self.left_digests[1].get(parent_num)
+            and right_digests[1].get(other_parent_num) == self.right_digests[1].get(other_parent_num)
+        )
+
+    def _splice(self, subreport, nodes, left, right):
+        # brings the branches below a reused one up to date in place, and records them for the next diff
+        swap = left is not self.left or right is not self.right
+        for tree_num, subtree, branch_report, level in walk_tree(subreport):
+            node = subtree[tree_num]
+            if swap:
+                node[0] = self._swap_items(branch_report, left, right)
+            nodes[tree_num] = (self.nodes[tree_num][0], node)
+
+    def _swap_items(self, branch_report, left, right):
+        # the reports point at the items of the BOMs they were made with. Swap in the same items of the new ones
+        common_self, common_other, diff_attrs, self_only, other_only = branch_report
+        if left is not self.left:
+            common_self = _same_items(common_self, left)
+            self_only = _same_items(self_only, left)
+        if right is not self.right:
+            common_other = _same_items(common_other, right)
+            other_only = _same_items(other_only, right)
+        return common_self, common_other, diff_attrs, self_only, other_only
+
+
+def _same_items(items, bom):
+    # the items at the same tree numbers in bom
+    nodes = bom.tree_index.nodes
+    number_by_tree_num = bom.tree_index.number_by_tree_num
+    return [nodes[number_by_tree_num[item.tree_num]][0] for item in items]
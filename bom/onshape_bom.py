@@ -10,7 +10,9 @@ class OnshapeBOM(BOM):
         super(OnshapeBOM, self).__init__(name)
 
     def create_item(self, line):
-        return OnshapeItem.from_line(self.header, line)
+        return OnshapeItem.from_line(
+            self.header, line, plan=self.get_header_plan(OnshapeItem)
+        )
 
     def recreate_item(self, item, header=None):
         return OnshapeItem.from_item(item, header)
@@ -21,7 +23,9 @@ class OnshapeStructured(StructuredBOM):
         super(OnshapeStructured, self).__init__(name)
 
     def create_item(self, line):
-        return StructuredOnshapeItem.from_line(self.header, line)
+        return StructuredOnshapeItem.from_line(
+            self.header, line, plan=self.get_header_plan(StructuredOnshapeItem)
+        )
 
     def recreate_item(self, item, header=None):
         return StructuredOnshapeItem.from_item(item, header)
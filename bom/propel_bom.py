@@ -1,5 +1,6 @@
 from bom.bom import BOM
 from item.propel_item import PropelItem, StructuredPropelItem
+from item.tree_counter import TreeCounter
 
 from .structured_bom import StructuredBOM
 
@@ -9,7 +10,9 @@ class PropelBOM(BOM):
         super(PropelBOM, self).__init__(name)
 
     def create_item(self, line):
-        return PropelItem.from_line(self.header, line)
+        return PropelItem.from_line(
+            self.header, line, plan=self.get_header_plan(PropelItem)
+        )
 
     def recreate_item(self, item, header=None):
         return PropelItem.from_item(item, header)
@@ -19,14 +22,21 @@ class PropelStructured(StructuredBOM):
     def __init__(self, name):
         super(PropelStructured, self).__init__(name)
 
-    def _preprocess_tree_num(self):
-        min_level = min(self.items, key=lambda item: item.level).level
-        StructuredPropelItem.set_tree_counter(min_level)
+    def _assign_tree_num(self, item):
+        # propel rows are numbered from their level once the whole file is read
+        pass
 
-        super(PropelStructured, self)._preprocess_tree_num()
+    def _preprocess_tree_num(self, tree_counter=None):
+        if tree_counter is None:
+            min_level = min(self.items, key=lambda item: item.level).level
+            tree_counter = TreeCounter(min_level)
+
+        super(PropelStructured, self)._preprocess_tree_num(tree_counter)
 
     def create_item(self, line):
-        return StructuredPropelItem.from_line(self.header, line)
+        return StructuredPropelItem.from_line(
+            self.header, line, plan=self.get_header_plan(StructuredPropelItem)
+        )
 
     def recreate_item(self, item, header=None):
         return StructuredPropelItem.from_item(item, header)
@@ -9,7 +9,9 @@ class SolidworksBOM(BOM):
         super(SolidworksBOM, self).__init__(name)
 
     def create_item(self, line):
-        return SolidworksItem.from_line(self.header, line)
+        return SolidworksItem.from_line(
+            self.header, line, plan=self.get_header_plan(SolidworksItem)
+        )
 
     def recreate_item(self, item, header=None):
         return SolidworksItem.from_item(item, header)
@@ -20,7 +22,9 @@ class SolidworksStructured(StructuredBOM):
         super(SolidworksStructured, self).__init__(name)
 
     def create_item(self, line):
-        return StructuredSolidworksItem.from_line(self.header, line)
+        return StructuredSolidworksItem.from_line(
+            self.header, line, plan=self.get_header_plan(StructuredSolidworksItem)
+        )
 
     def recreate_item(self, item, header=None):
         return StructuredSolidworksItem.from_item(item, header)
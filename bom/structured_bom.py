@@ -1,26 +1,74 @@
-import copy
 import csv
-import json
-
-import yaml
+import operator
 
+import metrics
 from item.structured_item import StructuredBomItem
 from item.tree_counter import TreeCounter
 from logger import LoggerManager
 
 from .bom import BOM, TableColors
+from .tree_index import TreeIndex
+from .tree_walk import PRE_ORDER, walk_tree
+from .tree_writers import write_json_tree, write_ndjson_tree, write_yaml_tree
 
 logger = LoggerManager.get_logger()
 
+# stands in for attributes an item doesn't have in digests
+_MISSING = object()
+# content digest of an item without children
+_NO_BRANCHES = hash(())
+
+# flatten modes. RAW_QUANTITIES sums each item's quantities as listed, EXTENDED_QUANTITIES multiplies them through the
+# quantities of the assemblies above it first
+RAW_QUANTITIES = "raw"
+EXTENDED_QUANTITIES = "extended"
+FLATTEN_MODES = (RAW_QUANTITIES, EXTENDED_QUANTITIES)
+
 
 class StructuredBOM(BOM):
     def __init__(self, name):
         super(StructuredBOM, self).__init__(name)
         self.tree = {}
+        # tree_num -> branch of self.tree, filled in by set_branch
+        self.tree_index = TreeIndex()
         self.flattened = {}
 
+        # highest top level tree number in this BOM. Items without a tree number are numbered after it
+        self.max_parent = 0
+
+        # report matched assemblies whose content digests are equal as a single match, without going into them
+        self.skip_identical_assemblies = False
+        # how get_flattened totals quantities, one of FLATTEN_MODES
+        self.flatten_mode = RAW_QUANTITIES
+
+    def __getstate__(self):
+        # the tree nests as deep as the assemblies do, which can be too deep to pickle. It's rebuilt from the
+        # items instead, which _build_tree put in it in order
+        state = self.__dict__.copy()
+        del state["tree"]
+        del state["tree_index"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.clear_tree()
+        for item in self.items:
+            self.set_branch(item, item.tree_num)
+
+    def append(self, item):
+        if item:
+            self._assign_tree_num(item)
+        super(StructuredBOM, self).append(item)
+
+    def _assign_tree_num(self, item):
+        if len(item.tree_num) != 0:
+            return
+        self.max_parent += 1
+        item.tree_num = str(self.max_parent)
+
     def clear_tree(self):
         self.tree = {}
+        self.tree_index = TreeIndex()
 
     @classmethod
     def from_tree(cls, name, tree) -> "StructuredBOM":
@@ -29,23 +77,27 @@ class StructuredBOM(BOM):
         return obj
 
     @classmethod
-    def from_file(cls, path) -> "StructuredBOM":
-        return super(StructuredBOM, cls).from_file(path)
+    def from_file(cls, path, sheet_name=None) -> "StructuredBOM":
+        return super(StructuredBOM, cls).from_file(path, sheet_name)
 
     @classmethod
     def from_csv(cls, path) -> "StructuredBOM":
         obj = super(StructuredBOM, cls).from_csv(path)
-        obj._build_tree()
+        with metrics.span("build tree"):
+            obj._build_tree()
         return obj
 
     @classmethod
-    def from_xlsx(cls, path) -> "StructuredBOM":
-        obj = super(StructuredBOM, cls).from_xlsx(path)
-        obj._build_tree()
+    def from_xlsx(cls, path, sheet_name=None) -> "StructuredBOM":
+        obj = super(StructuredBOM, cls).from_xlsx(path, sheet_name)
+        with metrics.span("build tree"):
+            obj._build_tree()
         return obj
 
     def create_item(self, line):
-        return StructuredBomItem.from_line(self.header, line)
+        return StructuredBomItem.from_line(
+            self.header, line, plan=self.get_header_plan(StructuredBomItem)
+        )
 
     def recreate_item(self, item, header=None):
         return StructuredBomItem.from_item(item, header)
@@ -82,9 +134,22 @@ class StructuredBOM(BOM):
         self.apply_fn(get_items, tree)
         self._build_tree()
 
-    def set_branch(self, obj, tree_num, tree=None):
+    def set_branch(self, obj, tree_num, tree=None, index=None):
+        # index is the TreeIndex of tree. Without one, the branch is found by walking down from the top level
         if tree is None:  # supply a default value
             tree = self.tree
+        if tree is self.tree:
+            index = self.tree_index
+        if index is not None:
+            branch = index.insert(tree, tree_num)
+            if branch[0] is not None:
+                raise ValueError(
+                    "Duplicate tree numbers in %s detected. %s tried to override %s with num %s"
+                    % (self.name, obj, branch[0], tree_num)
+                )
+            branch[0] = obj
+            return
+
         split_num = tree_num.split(".")
         curr_num = split_num.pop(0)  # get top level of tree num
         if (
@@ -131,7 +196,7 @@ class StructuredBOM(BOM):
         else:
             tree_nums = []
             for item in self.items:
-                if item.__dict__[key_name] == key_value:
+                if getattr(item, key_name) == key_value:
                     tree_nums.append(item.tree_num)
         results = []
         for tree_num in tree_nums:
@@ -140,9 +205,10 @@ class StructuredBOM(BOM):
         return results
 
     def branch_from_tree_num(self, tree_num, subtree=None):
+        if subtree is None or subtree is self.tree:
+            return self.tree_index.get(tree_num)
+
         split_num = tree_num.split(".")
-        if subtree is None:
-            subtree = self.tree
         curr_num = ""
         for level_index in split_num:
             if len(curr_num) == 0:
@@ -166,7 +232,7 @@ class StructuredBOM(BOM):
             assert isinstance(
                 item, StructuredBomItem
             ), "Encountered an invalid item (%s: %s)" % (type(item), item)
-            self.set_branch(item, item.tree_num, self.tree)
+            self.set_branch(item, item.tree_num)
             self._set_flattened_item(item)
         self._link_parents()
 
@@ -180,75 +246,199 @@ class StructuredBOM(BOM):
         else:
             self.flattened[item] += quantity
 
+    def extended_quantities(self):
+        """
+        {item: quantity} like flattened, but every quantity is multiplied by the quantities of the assemblies above
+        it: a screw used 4 times in an assembly that's used 3 times counts 12. Computed in one pass over the tree
+        index. Parents are indexed before their children, so an assembly's multiplier is known by the time its
+        children are reached. A quantity that's missing or not a number, like a blank cell, counts as 0 toward the
+        item's own total and doesn't change the multiplier of what's below it.
+        """
+        index = self.tree_index
+        nodes = index.nodes
+        parents = index.parents
+        multipliers = [1] * len(nodes)
+        totals = {}
+        for number in range(len(nodes)):
+            parent = parents[number]
+            multiplier = 1 if parent < 0 else multipliers[parent]
+            item = nodes[number][0]
+            if item is None:
+                multipliers[number] = multiplier
+                continue
+            quantity = item.quantity
+            if isinstance(quantity, (int, float)):
+                multiplier *= quantity
+                total = multiplier
+            else:
+                total = 0
+            multipliers[number] = multiplier
+            if item in totals:
+                totals[item] += total
+            else:
+                totals[item] = total
+        return totals
+
+    def set_flatten_mode(self, mode):
+        if mode not in FLATTEN_MODES:
+            raise ValueError(_unknown_flatten_mode(mode))
+        self.flatten_mode = mode
+
+    def get_flattened(self, mode=None):
+        # {item: total quantity} in mode, flatten_mode by default
+        if mode is None:
+            mode = self.flatten_mode
+        if mode == EXTENDED_QUANTITIES:
+            return self.extended_quantities()
+        if mode == RAW_QUANTITIES:
+            return self.flattened
+        raise ValueError(_unknown_flatten_mode(mode))
+
+    def to_flat(self, flat_cls, mode=None):
+        # flat_cls BOM of every item once, with its total quantity in mode
+        flattened = self.get_flattened(mode)
+        obj = flat_cls(self.name)
+        header = flat_cls._get_common_header(flattened)
+        for item, quantity in flattened.items():
+            flat_item = obj.recreate_item(item, header)
+            flat_item.quantity = quantity
+            obj.append(flat_item)
+        return obj
+
     def find_in_flattened(self, key, key_name):
         for item in self.flattened:
-            if key == item.__dict__[key_name]:
+            if key == getattr(item, key_name):
                 return item, self.flattened[item]
         return None
 
-    def _preprocess_tree_num(self):
+    def _preprocess_tree_num(self, tree_counter=None):
         for item in self.items:
-            item._parse_tree_num()
+            top_level = item._parse_tree_num(tree_counter)
+            if self.max_parent < top_level:
+                self.max_parent = top_level
 
     def _link_parents(self):
         for item in self.items:
             if item.parent_num:
-                item.parent = self.branch_from_tree_num(item.parent_num)[0]
-
-    def iter_tree(self, subtree=None, level=0):
+                item.parent = self.tree_index.get(item.parent_num)[0]
+
+    def subtree_digests(self, attr_names):
+        """
+        {tree_num: digest} for every assembly, with "" for the whole tree. A digest covers the branches below the
+        assembly, in order: their tree numbers, what they're matched on (primary value, key and category), the
+        attr_names values and the digests below them. Computed in one bottom-up pass over the tree index.
+        Digests come from hash(), so only compare them within one process.
+        """
+        return self._digest_tree(attr_names, _combine_ordered_digests, _tree_branch_digest)
+
+    def content_digests(self, attr_names):
+        """
+        {tree_num: digest} of what's below every assembly, with "" for the whole tree, to compare assemblies across
+        BOMs. Tree numbers and the order of branches don't count: two assemblies with the same digest have children
+        with the same keys, categories and attr_names values, whose children are the same in turn. An assembly with
+        a key more than once below it gets None, as do the assemblies above it, because matching pairs repeated keys
+        up by their order. Computed in one bottom-up pass over the tree index, with hash().
+        """
+        return self._digest_tree(attr_names, _combine_digests, _content_branch_digest)
+
+    def _digest_tree(self, attr_names, combine, branch_digest):
+        """
+        The pass both digests make. For every node of the tree index, children first, the digest of its subtree is
+        combine(child numbers, branch digests, keys) and the digest of the node with its subtree is
+        branch_digest(tree_num, item, key, values, subtree digest), where values are item's attr_names values.
+        item, key and values are None for nodes without an item.
+        """
+        index = self.tree_index
+        nodes = index.nodes
+        tree_nums = index.tree_nums
+        children = index.children
+        get_attrs = operator.attrgetter(*attr_names) if len(attr_names) > 0 else None
+
+        keys = [None] * len(nodes)
+        branch_digests = [None] * len(nodes)
+        digests = {}
+        # parents are always indexed before their children, so walking the numbers backwards visits every child
+        # before its parent
+        for number in range(len(nodes) - 1, -1, -1):
+            subtree_digest = combine(children[number], branch_digests, keys)
+            if len(children[number]) > 0:
+                digests[tree_nums[number]] = subtree_digest
+
+            item = nodes[number][0]
+            values = None
+            if item is not None:
+                try:
+                    values = None if get_attrs is None else get_attrs(item)
+                except AttributeError:
+                    values = tuple(getattr(item, attr_name, _MISSING) for attr_name in attr_names)
+                keys[number] = item.get_key()
+            branch_digests[number] = branch_digest(tree_nums[number], item, keys[number], values, subtree_digest)
+
+        top_level = [number for number, parent in enumerate(index.parents) if parent < 0]
+        digests[""] = combine(top_level, branch_digests, keys)
+        metrics.count("items hashed", len(nodes))
+        return digests
+
+    def set_skip_identical_assemblies(self, enabled):
+        self.skip_identical_assemblies = enabled
+
+    def iter_tree(self, subtree=None, level=0, sort_keys=False, order=PRE_ORDER, prune=None):
+        # (tree_num, subtree, item, level) for every branch. See tree_walk.walk_tree for order and prune
         if subtree is None:
             subtree = self.tree
-        for tree_num in subtree:
-            item = subtree[tree_num][0]
-            yield tree_num, subtree, item, level
-            yield from self.iter_tree(subtree[tree_num][1], level + 1)
+        return walk_tree(subtree, order, prune, sort_keys, level)
 
     def _iter_tree_with_fn(self, callback, subtree=None, level=0):
         if subtree is None:
             subtree = self.tree
 
-        for tree_num in subtree:
-            callback(tree_num, subtree, subtree[tree_num][0], level)
-            if isinstance(subtree[tree_num], list) and len(subtree[tree_num][1]) > 0:
-                self._iter_tree_with_fn(callback, subtree[tree_num][1], level + 1)
+        for tree_num, branch_subtree, item, branch_level in walk_tree(subtree, level=level):
+            callback(tree_num, branch_subtree, item, branch_level)
 
-    def apply_fn(self, callback, tree=None, create_new_tree=False):
+    def apply_fn(self, callback, tree=None):
         if tree is None:
             tree = self.tree
-        if create_new_tree:
-            copy_tree = copy.deepcopy(tree)
-        else:
-            copy_tree = tree
-        self._iter_tree_with_fn(callback, copy_tree)
-        return copy_tree
+        self._iter_tree_with_fn(callback, tree)
 
     def to_json(self, path, tree=None):
-        def jsonify(tree_num, subtree, item, level):
+        def jsonify(tree_num, item, level):
             if isinstance(item, StructuredBomItem):
-                item_str = item.to_json()
-            else:
-                item_str = ""
-
-            if len(subtree[tree_num][1]) == 0:
-                subtree[tree_num] = item_str
-            else:
-                subtree[tree_num][0] = item_str
-            # subtree[tree_num][0] = item_str
+                return item.to_json()
+            return ""
 
-        json_tree = self.apply_fn(jsonify, tree, create_new_tree=True)
-
-        self._dump_to_json(path, json_tree)
+        assert path.endswith(".json")
+        with open(path, "w") as file:
+            write_json_tree(file, self.iter_tree(tree), jsonify)
+
+    def to_ndjson(self, path, tree=None):
+        # one line per branch with the item's attributes, for tools that read the tree as it's written
+        headers = {}
+
+        def recordify(tree_num, item, level):
+            if item is None:
+                return {}
+            header = headers.get(item.__class__)
+            if header is None:
+                header = item.get_header()
+                headers[item.__class__] = header
+            return {name: getattr(item, name, None) for name in header}
+
+        assert path.endswith((".ndjson", ".jsonl"))
+        with open(path, "w") as file:
+            write_ndjson_tree(file, self.iter_tree(tree), recordify)
 
-    def flattened_to_csv(self, path):
-        flattened = copy.deepcopy(self.flattened)
-        # output = []
+    def flattened_to_csv(self, path, mode=None):
+        # mode is one of FLATTEN_MODES, flatten_mode by default
+        flattened = self.get_flattened(mode)
         header_list = next(iter(flattened.keys())).get_preparsed_header()
         output = [header_list]
         for counter, (item, quantity) in enumerate(flattened.items()):
-            item.tree_num = counter + 1
-            item.level = 1
-            item.quantity = quantity
-            output.append(item.to_list())
+            # each row is numbered as a top level item with its total quantity. The item itself isn't touched
+            output.append(
+                item.to_list(
+                    overrides={"tree_num": counter + 1, "level": 1, "quantity": quantity}
+                )
+            )
         self._dump_to_csv(path, output)
 
     def to_csv(self, path):
@@ -266,22 +456,13 @@ class StructuredBOM(BOM):
             for row in obj:
                 writer.writerow(row)
 
-    def _dump_to_json(self, path, obj):
-        assert path.endswith(".json")
-        with open(path, "w") as file:
-            json.dump(obj, file, indent=4)
-
-    def _dump_to_yaml(self, path, obj):
-        assert path.endswith(".yaml")
-        with open(path, "w") as file:
-            yaml.safe_dump(obj, file)
-
     def assemblies_only(self):
         assemblies_tree = {}
+        assemblies_index = TreeIndex()
 
         def filter_assemblies(tree_num, subtree, item, level):
             if len(subtree[tree_num][1]) > 0:  # and item.category == "ASM":
-                self.set_branch(item, tree_num, assemblies_tree)
+                self.set_branch(item, tree_num, assemblies_tree, assemblies_index)
 
         self.apply_fn(filter_assemblies)
         return assemblies_tree
@@ -303,52 +484,99 @@ class StructuredBOM(BOM):
         raise NotImplementedError
 
     def diff_subassembly(self, this_subtree, other_subtree):
-        my_items = [branch[0] for branch in this_subtree.values()]
-        other_items = [branch[0] for branch in other_subtree.values()]
-        my_items.sort()
-        other_items.sort()
+        (
+            common_parts_self,
+            common_parts_other,
+            self_only,
+            other_only,
+        ) = self._match_subassembly(this_subtree, other_subtree)
+        common_parts_diff_attrs = [
+            self_item.diff(other_item, self.item_diff_names)
+            for self_item, other_item in zip(common_parts_self, common_parts_other)
+        ]
+        return (
+            common_parts_self,
+            common_parts_other,
+            common_parts_diff_attrs,
+            self_only,
+            other_only,
+        )
+
+    def _match_subassembly(self, this_subtree, other_subtree):
+        # children are sorted so the report order stays deterministic, matching goes through key maps
+        my_items = sorted(
+            branch[0] for branch in this_subtree.values() if branch[0] is not None
+        )
+        other_items = sorted(
+            branch[0] for branch in other_subtree.values() if branch[0] is not None
+        )
+
+        # first child (in sorted order) wins when a key repeats within the branch
+        other_by_key = {}
+        for other_item in other_items:
+            other_by_key.setdefault(other_item.get_key(), other_item)
 
         common_parts_self = []
         common_parts_other = []
-        common_parts_diff_attrs = []
         self_only = []
+        my_keys = set()
         for item in my_items:
-            if item is None or item.category in self.ignored_categories:
+            key = item.get_key()
+            my_keys.add(key)
+            if item.category in self.ignored_categories:
                 continue
-            if item in other_items:
+            other_item = other_by_key.get(key)
+            if other_item is not None:
                 common_parts_self.append(item)
-
-                other_index = other_items.index(item)
-                other_item = other_items[other_index]
                 common_parts_other.append(other_item)
-
-                common_parts_diff_attrs.append(
-                    item.diff(other_item, self.item_diff_names)
-                )
             else:
                 self_only.append(item)
 
         other_only = []
         for other_item in other_items:
-            if other_item is None or other_item.category in self.ignored_categories:
+            if other_item.category in self.ignored_categories:
                 continue
-            if other_item not in my_items:
+            if other_item.get_key() not in my_keys:
                 other_only.append(other_item)
-        return (
-            common_parts_self,
-            common_parts_other,
-            common_parts_diff_attrs,
-            self_only,
-            other_only,
-        )
-
-    def _diff(
-        self, diff_report, this_tree, other_tree, toplevel_other=None, parent_num=""
-    ):
-        if toplevel_other is None:
-            toplevel_other = other_tree
-
-        branch_report = self.diff_subassembly(this_tree, other_tree)
+        return common_parts_self, common_parts_other, self_only, other_only
+
+    def _diff(self, branches, other, this_tree, other_tree, reuse=None, digests=None):
+        # appends (parent num, other parent num, branch report) for every branch that gets compared, in depth first
+        # order, and returns the positions of the ones it matched itself. Those only have a match report so far:
+        # (common self, common other, self only, other only). Branches reuse returns are appended as they are.
+        # With digests, (self content digests, other content digests), a pair of assemblies with equal digests gets
+        # an empty report, which reads as a match, and isn't gone into.
+        # Walks both trees together with its own stack, so deep assemblies can't hit the recursion limit
+        matched = []
+        num_skipped = 0
+        stack = [(this_tree, other_tree, "", "")]
+        while len(stack) > 0:
+            this_tree, other_tree, parent_num, other_parent_num = stack.pop()
+            if reuse is not None:
+                reused_branches = reuse(parent_num, other_parent_num)
+                if reused_branches is not None:
+                    branches.extend(reused_branches)
+                    continue
+            matched.append(len(branches))
+            if digests is not None:
+                digest = digests[0].get(parent_num)
+                if digest is not None and digest == digests[1].get(other_parent_num):
+                    branches.append((parent_num, other_parent_num, ([], [], [], [])))
+                    num_skipped += 1
+                    continue
+            matched_branches = self._diff_branch(
+                branches, other, this_tree, other_tree, parent_num, other_parent_num
+            )
+            stack.extend(reversed(matched_branches))
+        if digests is not None:
+            logger.debug("Skipped %s identical assemblies" % num_skipped)
+            metrics.count("subtrees skipped", num_skipped)
+        metrics.count("subtrees visited", len(matched) - num_skipped)
+        return matched
+
+    def _diff_branch(self, branches, other, this_tree, other_tree, parent_num, other_parent_num):
+        # matches one branch and returns the matched assemblies, whose children are compared next
+        branch_report = self._match_subassembly(this_tree, other_tree)
         # if len(this_tree) > 0:
         #     some_item = next(iter(this_tree.values()))[0]
         # else:
@@ -359,35 +587,80 @@ class StructuredBOM(BOM):
         #     report_tree_num = "1"
         # else:
         #     report_tree_num = "1." + some_item.parent_num
-        self.set_branch(branch_report, parent_num, diff_report)
+        branches.append((parent_num, other_parent_num, branch_report))
         common_parts_self = branch_report[0]
         common_parts_other = branch_report[1]
+        matched_branches = []
         for self_item, other_item in zip(common_parts_self, common_parts_other):
             tree_num = self_item.tree_num
             other_tree_num = other_item.tree_num
 
-            next_item, next_tree = self.branch_from_tree_num(tree_num, self.tree)
-            other_next_item, other_next_tree = self.branch_from_tree_num(
-                other_tree_num, toplevel_other
-            )
+            next_item, next_tree = self.tree_index.get(tree_num)
+            other_next_item, other_next_tree = other.tree_index.get(other_tree_num)
 
             # if other_next_item.category in ("CBL", "PCA", "CON"):
             #     continue
 
             if len(next_tree) > 0 or len(other_next_tree) > 0:
-                self._diff(
-                    diff_report, next_tree, other_next_tree, toplevel_other, tree_num
-                )
-
-    def diff(self, other):
-        # compare assembly structure. Do parents match? Use item hash comparison
-        # if an assembly branch matches, compare items in assembly
+                matched_branches.append((next_tree, other_next_tree, tree_num, other_tree_num))
+        return matched_branches
+
+    def diff_branches(self, other, reuse=None):
+        """
+        (parent num, other parent num, branch report) for every pair of assemblies diff compares, in depth first
+        order. A branch report is (common self, common other, common diff attrs, self only, other only), the value
+        diff puts in the report under parent num.
+        reuse(parent num, other parent num) is asked before each pair is matched. It can return the branches of an
+        earlier diff of the same two assemblies, which are used instead of matching them and everything below
+        them again, or None.
+        """
         assert isinstance(other, StructuredBOM)
 
+        digests = None
+        if self.skip_identical_assemblies:
+            with metrics.span("content digests"):
+                attr_names = self.get_diff_attr_names(other)
+                digests = (self.content_digests(attr_names), other.content_digests(attr_names))
+
+        branches = []
+        with metrics.span("match assemblies"):
+            matched = self._diff(branches, other, self.tree, other.tree, reuse, digests)
+
+        # the attributes of every matched pair in the tree are compared in one go, then handed out per branch
+        common_parts_self = []
+        common_parts_other = []
+        for position in matched:
+            branch_report = branches[position][2]
+            common_parts_self.extend(branch_report[0])
+            common_parts_other.extend(branch_report[1])
+        with metrics.span("compare items"):
+            diff_attrs = self.diff_items(other, common_parts_self, common_parts_other)
+
+        start = 0
+        for position in matched:
+            parent_num, other_parent_num, branch_report = branches[position]
+            branch_self, branch_other, self_only, other_only = branch_report
+            stop = start + len(branch_self)
+            branches[position] = (
+                parent_num,
+                other_parent_num,
+                (branch_self, branch_other, diff_attrs[start:stop], self_only, other_only),
+            )
+            start = stop
+        return branches
+
+    def diff_report_from_branches(self, branches):
         diff_report = {}
-        self._diff(diff_report, self.tree, other.tree)
+        diff_report_index = TreeIndex()
+        for parent_num, _, branch_report in branches:
+            self.set_branch(branch_report, parent_num, diff_report, diff_report_index)
         return diff_report
 
+    def diff(self, other):
+        # compare assembly structure. Do parents match? Use item hash comparison
+        # if an assembly branch matches, compare items in assembly
+        return self.diff_report_from_branches(self.diff_branches(other))
+
     def diff_report_to_str(
         self, diff_report, other, show_common=False, skip_attrs=None
     ):
@@ -456,65 +729,88 @@ class StructuredBOM(BOM):
             report_str += "\n"
         return report_str
 
-    def diff_report_to_yaml(self, path, diff_report, other):
-        def yamlify(tree_num, subtree, subreport, level):
-            if len(tree_num) > 0:
-                assembly_item = self.branch_from_tree_num(tree_num)[0]
-                header = "%s\t%s\t%s" % (
-                    tree_num,
-                    assembly_item,
-                    assembly_item.description,
-                )
-            else:
-                header = "Top Level"
-            # common_parts = item[1]
-            self_only_report = []
-            other_only_report = []
-
-            # common_parts_self = subreport[0]
-            # common_parts_other = subreport[1]
-            # common_parts_diff_attrs = subreport[2]
-            self_only = subreport[3]
-            other_only = subreport[4]
-
-            for item in self_only:
-                self_only_report.append(
-                    "%s\t%s\t%s" % (item.tree_num, item, item.description)
-                )
-            for item in other_only:
-                other_only_report.append(
-                    "%s\t%s\t%s" % (item.tree_num, item, item.description)
-                )
+    def _diff_report_branch(self, tree_num, subreport, other):
+        # the assembly and the items only one side has, as plain values
+        if len(tree_num) > 0:
+            assembly_item = self.branch_from_tree_num(tree_num)[0]
+            header = "%s\t%s\t%s" % (
+                tree_num,
+                assembly_item,
+                assembly_item.description,
+            )
+        else:
+            header = "Top Level"
+        # common_parts = item[1]
+        self_only_report = []
+        other_only_report = []
+
+        # common_parts_self = subreport[0]
+        # common_parts_other = subreport[1]
+        # common_parts_diff_attrs = subreport[2]
+        self_only = subreport[3]
+        other_only = subreport[4]
+
+        for item in self_only:
+            self_only_report.append(
+                "%s\t%s\t%s" % (item.tree_num, item, item.description)
+            )
+        for item in other_only:
+            other_only_report.append(
+                "%s\t%s\t%s" % (item.tree_num, item, item.description)
+            )
 
-            yaml_subreport = {
-                "header": header,
-                self.name: self_only_report,
-                other.name: other_only_report,
-            }
+        return {
+            "header": header,
+            self.name: self_only_report,
+            other.name: other_only_report,
+        }
 
-            if len(subtree[tree_num][1]) == 0:
-                subtree[tree_num] = yaml_subreport
-            else:
-                subtree[tree_num][0] = yaml_subreport
-            # subtree[tree_num][0] = item_str
+    def diff_report_to_yaml(self, path, diff_report, other):
+        def yamlify(tree_num, subreport, level):
+            return self._diff_report_branch(tree_num, subreport, other)
+
+        assert path.endswith(".yaml")
+        with open(path, "w") as file:
+            write_yaml_tree(file, self.iter_tree(diff_report, sort_keys=True), yamlify)
+
+    def diff_report_to_ndjson(self, path, diff_report, other):
+        # one line per compared assembly. Besides what the YAML report has, "different" lists the matched items
+        # whose compared attributes differ, with both values
+        def recordify(tree_num, subreport, level):
+            record = self._diff_report_branch(tree_num, subreport, other)
+            different = []
+            for self_item, other_item, diff_attrs in zip(subreport[0], subreport[1], subreport[2]):
+                if len(diff_attrs) == 0:
+                    continue
+                different.append(
+                    {
+                        "item": str(self_item),
+                        self.name: self_item.tree_num,
+                        other.name: other_item.tree_num,
+                        "attributes": {
+                            attr_name: [getattr(self_item, attr_name), getattr(other_item, attr_name)]
+                            for attr_name in diff_attrs
+                        },
+                    }
+                )
+            record["different"] = different
+            return record
 
-        yaml_tree = self.apply_fn(yamlify, diff_report, create_new_tree=True)
-        self._dump_to_yaml(path, yaml_tree)
+        assert path.endswith((".ndjson", ".jsonl"))
+        with open(path, "w") as file:
+            write_ndjson_tree(file, self.iter_tree(diff_report), recordify)
 
-    def diff_report_to_table(self, diff_report, other, show_common=False):
+    def iter_diff_report_table(self, diff_report, other, show_common=False):
         header_length = 1 + len(self.item_show_names) * 2
         first_row = ["", "%s (%s)" % (self.name, len(self.items))]
         for _ in range(len(self.item_show_names)):
             first_row.append("")
         first_row.append("%s (%s)" % (other.name, len(other.items)))
         self._fill_to_length(first_row, header_length)
-        report = [first_row]
-        color_mapping = [[TableColors.TITLE for _ in range(len(first_row))]]
+        yield first_row, [TableColors.TITLE for _ in range(len(first_row))]
 
         second_row = ["#"] + self.item_show_names + self.item_show_names
-        self._fill_to_length(first_row, header_length)
-        color_mapping.append([TableColors.TITLE for _ in range(len(second_row))])
-        report.append(second_row)
+        yield second_row, [TableColors.TITLE for _ in range(len(second_row))]
 
         for tree_num, subtree, item, level in self.iter_tree(diff_report):
             if len(tree_num) > 0:
@@ -527,22 +823,14 @@ class StructuredBOM(BOM):
                 ]
                 self._fill_to_length(row, header_length)
 
-                report.append(row)
-                color_mapping.append(
-                    [TableColors.SUB_ASSEMBLY for _ in range(len(row))]
-                )
+                yield row, [TableColors.SUB_ASSEMBLY for _ in range(len(row))]
             else:
                 assembly_item = None
                 row = ["Top Level"]
                 self._fill_to_length(row, header_length)
 
-                report.append(row)
-                color_mapping.append(
-                    [TableColors.SUB_ASSEMBLY for _ in range(len(row))]
-                )
-            no_differences = self._diff_toplevel_to_table(
-                item, show_common, report, color_mapping
-            )
+                yield row, [TableColors.SUB_ASSEMBLY for _ in range(len(row))]
+            no_differences = yield from self._iter_toplevel_table(item, show_common)
 
             if no_differences:
                 if assembly_item is None:
@@ -551,7 +839,6 @@ class StructuredBOM(BOM):
                     assembly_item_code = assembly_item.get_primary()
                 bom_match_row = ["", "BOMs match for %s" % assembly_item_code]
                 self._fill_to_length(bom_match_row, header_length)
-                report.append(bom_match_row)
 
                 bom_match_colors = [TableColors.BLANK]
                 bom_match_colors.extend(
@@ -560,14 +847,12 @@ class StructuredBOM(BOM):
                 bom_match_colors.extend(
                     [TableColors.RIGHT_MATCH for _ in range(len(self.item_show_names))]
                 )
-                color_mapping.append(bom_match_colors)
+                yield bom_match_row, bom_match_colors
 
             # else:
             #     if assembly_item:  # display top level item in diff report
             #         print("%s\t%s" % (assembly_item.propel_number, assembly_item.description))
 
-        return report, color_mapping
-
     def diff_report_to_csv(self, path, diff_report, other, show_common=False):
         report, color_mapping = self.diff_report_to_table(
             diff_report, other, show_common
@@ -581,3 +866,35 @@ class StructuredBOM(BOM):
             # s += "%s%s\n" % (("\t" * level), "\t".join(item_str))
             s += "\t".join(item_str) + "\n"
         return s
+
+
+def _unknown_flatten_mode(mode):
+    return "Unknown flatten mode '%s', expected one of %s" % (mode, ", ".join(FLATTEN_MODES))
+
+
+def _tree_branch_digest(tree_num, item, key, values, subtree_digest):
+    # a branch where it is in the tree, for subtree_digests
+    item_digest = None if item is None else (item.get_primary(), key, item.category, values)
+    return hash((tree_num, item_digest, subtree_digest))
+
+
+def _combine_ordered_digests(numbers, branch_digests, keys):
+    # digest of the branches numbers, in order
+    return hash(tuple([branch_digests[number] for number in numbers]))
+
+
+def _content_branch_digest(tree_num, item, key, values, subtree_digest):
+    # a branch wherever it is in the tree, for content_digests. None when it can't be compared
+    if item is None or subtree_digest is None:
+        return None
+    return hash((key, item.category, values, subtree_digest))
+
+
+def _combine_digests(numbers, branch_digests, keys):
+    # digest of the branches numbers, in any order. None if any of them is None or two have the same key
+    if len(numbers) == 0:
+        return _NO_BRANCHES
+    digests = [branch_digests[number] for number in numbers]
+    if None in digests or len(set([keys[number] for number in numbers])) < len(numbers):
+        return None
+    return hash(tuple(sorted(digests)))
@@ -0,0 +1,86 @@
+class TreeIndex:
+    """
+    Flat index of a BOM tree ({tree_num: [item, children]}), so a branch is found with one dict lookup instead of
+    walking down from the top level on every call.
+    Every node gets a number in insertion order:
+        nodes[n]      the [item, children] list that is also in the tree
+        tree_nums[n]  its tree number
+        parents[n]    the number of its parent node, -1 for top level nodes
+        children[n]   the numbers of its child nodes, in order
+    Parents always get their number before their children. A parent that doesn't exist yet is created as
+    [None, {}], the same placeholder StructuredBOM.set_branch has always used.
+    Only trees filled through insert() are indexed. Don't add branches to them any other way.
+    """
+
+    def __init__(self):
+        self.nodes = []
+        self.tree_nums = []
+        self.parents = []
+        self.children = []
+        self.number_by_tree_num = {}
+
+    @staticmethod
+    def parent_num_of(tree_num):
+        # "" for top level tree numbers
+        parent_num, _, _ = tree_num.rpartition(".")
+        return parent_num
+
+    def __contains__(self, tree_num):
+        return tree_num in self.number_by_tree_num
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def get(self, tree_num):
+        # [item, children] for tree_num. Raises KeyError if it isn't in the tree
+        return self.nodes[self.number_by_tree_num[tree_num]]
+
+    def get_parent(self, tree_num):
+        parent = self.parents[self.number_by_tree_num[tree_num]]
+        if parent < 0:
+            return None
+        return self.nodes[parent]
+
+    def get_children(self, tree_num):
+        return [self.nodes[child] for child in self.children[self.number_by_tree_num[tree_num]]]
+
+    def insert(self, tree, tree_num):
+        """
+        Returns the node for tree_num in tree, creating it (and any missing parents) as [None, {}]
+        """
+        number = self.number_by_tree_num.get(tree_num)
+        if number is not None:
+            return self.nodes[number]
+
+        # the tree numbers to create, from tree_num up to the first ancestor that exists
+        missing = [tree_num]
+        while "." in missing[-1]:
+            parent_num = self.parent_num_of(missing[-1])
+            if parent_num in self.number_by_tree_num:
+                break
+            missing.append(parent_num)
+
+        for missing_num in reversed(missing):
+            node = self._add(tree, missing_num)
+        return node
+
+    def _add(self, tree, tree_num):
+        # tree_num's parent is already indexed (or it's a top level tree number)
+        if "." in tree_num:
+            parent = self.number_by_tree_num[self.parent_num_of(tree_num)]
+            siblings = self.nodes[parent][1]
+        else:
+            parent = -1
+            siblings = tree
+
+        node = [None, {}]
+        siblings[tree_num] = node
+        number = len(self.nodes)
+        self.nodes.append(node)
+        self.tree_nums.append(tree_num)
+        self.parents.append(parent)
+        self.children.append([])
+        if parent >= 0:
+            self.children[parent].append(number)
+        self.number_by_tree_num[tree_num] = number
+        return node
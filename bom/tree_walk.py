@@ -0,0 +1,94 @@
+from collections import deque
+
+PRE_ORDER = "pre"
+POST_ORDER = "post"
+LEVEL_ORDER = "level"
+ORDERS = (PRE_ORDER, POST_ORDER, LEVEL_ORDER)
+
+_END = object()
+
+
+def walk_tree(tree, order=PRE_ORDER, prune=None, sort_keys=False, level=0):
+    """
+    Yields (tree_num, subtree, item, level) for every branch of a {tree_num: [item, children]} tree, where
+    subtree is the dict holding the branch. Uses its own stack, so the depth of the tree doesn't matter.
+        PRE_ORDER    a branch, then its children. Depth first
+        POST_ORDER   a branch's children, then the branch
+        LEVEL_ORDER  every top level branch, then every branch one level down, and so on
+    prune(tree_num, subtree, item, level) is asked about every branch with children. If it returns True the
+    branch is still yielded but its children aren't. With sort_keys, siblings come in sorted tree_num order
+    instead of insertion order.
+    In pre-order and level order a branch's children are looked up after it's yielded, so the consumer may
+    replace or empty them first.
+    """
+    if order == PRE_ORDER:
+        return _walk_pre_order(tree, prune, sort_keys, level)
+    if order == POST_ORDER:
+        return _walk_post_order(tree, prune, sort_keys, level)
+    if order == LEVEL_ORDER:
+        return _walk_level_order(tree, prune, sort_keys, level)
+    raise ValueError("Unknown tree order '%s'. Choose from: %s" % (order, ", ".join(ORDERS)))
+
+
+def _iter_keys(subtree, sort_keys):
+    return iter(sorted(subtree) if sort_keys else subtree)
+
+
+def _get_children(subtree, tree_num, level, prune):
+    # the children to descend into, or None
+    branch = subtree[tree_num]
+    if not isinstance(branch, list) or len(branch[1]) == 0:
+        return None
+    if prune is not None and prune(tree_num, subtree, branch[0], level):
+        return None
+    return branch[1]
+
+
+def _walk_pre_order(tree, prune, sort_keys, level):
+    # each frame is (remaining tree nums, the dict they're in, their level)
+    stack = [(_iter_keys(tree, sort_keys), tree, level)]
+    while len(stack) > 0:
+        tree_nums, subtree, branch_level = stack[-1]
+        tree_num = next(tree_nums, _END)
+        if tree_num is _END:
+            stack.pop()
+            continue
+        yield tree_num, subtree, subtree[tree_num][0], branch_level
+
+        children = _get_children(subtree, tree_num, branch_level, prune)
+        if children is not None:
+            stack.append((_iter_keys(children, sort_keys), children, branch_level + 1))
+
+
+def _walk_post_order(tree, prune, sort_keys, level):
+    # like pre-order, but a frame also remembers the branch whose children it walks, to yield it afterwards
+    stack = [(_iter_keys(tree, sort_keys), tree, level, None)]
+    while len(stack) > 0:
+        tree_nums, subtree, branch_level, parent = stack[-1]
+        tree_num = next(tree_nums, _END)
+        if tree_num is _END:
+            stack.pop()
+            if parent is not None:
+                parent_num, parent_subtree = parent
+                yield parent_num, parent_subtree, parent_subtree[parent_num][0], branch_level - 1
+            continue
+
+        children = _get_children(subtree, tree_num, branch_level, prune)
+        if children is not None:
+            stack.append(
+                (_iter_keys(children, sort_keys), children, branch_level + 1, (tree_num, subtree))
+            )
+        else:
+            yield tree_num, subtree, subtree[tree_num][0], branch_level
+
+
+def _walk_level_order(tree, prune, sort_keys, level):
+    queue = deque([(tree, level)])
+    while len(queue) > 0:
+        subtree, branch_level = queue.popleft()
+        for tree_num in _iter_keys(subtree, sort_keys):
+            yield tree_num, subtree, subtree[tree_num][0], branch_level
+
+            children = _get_children(subtree, tree_num, branch_level, prune)
+            if children is not None:
+                queue.append((children, branch_level + 1))
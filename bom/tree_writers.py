@@ -0,0 +1,159 @@
+import json
+from json.encoder import encode_basestring_ascii
+
+import yaml
+
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeDumper
+
+from .tree_index import TreeIndex
+
+# Writers for the branches StructuredBOM.iter_tree yields, (tree_num, subtree, item, level) in depth first order.
+# Each branch is written as soon as it's yielded, so the tree is never rebuilt in memory. In the JSON and YAML
+# output a branch is value_fn(tree_num, item, level), or [value, {children}] when it has children.
+
+YAML_MAP_TAG = "tag:yaml.org,2002:map"
+YAML_SEQ_TAG = "tag:yaml.org,2002:seq"
+
+
+def _has_children(subtree, tree_num):
+    return len(subtree[tree_num][1]) > 0
+
+
+def write_json_tree(file, branches, value_fn, indent=4):
+    """
+    Writes the same text as json.dump(tree, file, indent=indent)
+    """
+    pad = " " * indent
+    encoder = json.JSONEncoder(indent=indent)
+
+    def encode(value, value_pad):
+        # strings, by far the most common value, skip the encoder
+        if type(value) == str:
+            return encode_basestring_ascii(value)
+        return encoder.encode(value).replace("\n", "\n" + value_pad)
+
+    def close_branch(level):
+        branch_pad = pad * (1 + 2 * level)
+        file.write("\n%s%s}\n%s]" % (branch_pad, pad, branch_pad))
+
+    open_levels = []  # levels of the branches whose children are being written
+    need_comma = False
+    started = False
+    for tree_num, subtree, item, level in branches:
+        if not started:
+            file.write("{")
+            started = True
+        while len(open_levels) > 0 and open_levels[-1] >= level:
+            close_branch(open_levels.pop())
+            need_comma = True
+        if need_comma:
+            file.write(",")
+
+        branch_pad = pad * (1 + 2 * level)
+        file.write("\n%s%s: " % (branch_pad, encode_basestring_ascii(tree_num)))
+        value = value_fn(tree_num, item, level)
+        if _has_children(subtree, tree_num):
+            value_pad = branch_pad + pad
+            file.write("[\n%s%s,\n%s{" % (value_pad, encode(value, value_pad), value_pad))
+            open_levels.append(level)
+            need_comma = False
+        else:
+            file.write(encode(value, branch_pad))
+            need_comma = True
+
+    if not started:
+        file.write("{}")
+        return
+    while len(open_levels) > 0:
+        close_branch(open_levels.pop())
+    file.write("\n}")
+
+
+def _node_events(dumper, node):
+    # the events yaml's Serializer would emit for a node, without anchors
+    if isinstance(node, yaml.ScalarNode):
+        detected_tag = dumper.resolve(yaml.ScalarNode, node.value, (True, False))
+        default_tag = dumper.resolve(yaml.ScalarNode, node.value, (False, True))
+        implicit = (node.tag == detected_tag), (node.tag == default_tag)
+        yield yaml.ScalarEvent(None, node.tag, implicit, node.value, style=node.style)
+    elif isinstance(node, yaml.SequenceNode):
+        implicit = node.tag == dumper.resolve(yaml.SequenceNode, node.value, True)
+        yield yaml.SequenceStartEvent(None, node.tag, implicit, flow_style=node.flow_style)
+        for child in node.value:
+            yield from _node_events(dumper, child)
+        yield yaml.SequenceEndEvent()
+    else:
+        implicit = node.tag == dumper.resolve(yaml.MappingNode, node.value, True)
+        yield yaml.MappingStartEvent(None, node.tag, implicit, flow_style=node.flow_style)
+        for key, value in node.value:
+            yield from _node_events(dumper, key)
+            yield from _node_events(dumper, value)
+        yield yaml.MappingEndEvent()
+
+
+def _emit_data(dumper, data):
+    node = dumper.represent_data(data)
+    # nothing is shared between branches, so nothing needs an alias
+    dumper.represented_objects = {}
+    dumper.object_keeper = []
+    dumper.alias_key = None
+    for event in _node_events(dumper, node):
+        dumper.emit(event)
+
+
+def write_yaml_tree(file, branches, value_fn):
+    """
+    Writes the same document as yaml.safe_dump(tree, file), using libyaml when PyYAML has it. libyaml can pick a
+    different but equivalent form for some scalars, e.g. '': instead of ? ''.
+    branches must come in sorted tree_num order (iter_tree(sort_keys=True)), as safe_dump sorts keys.
+    """
+    dumper = SafeDumper(file, default_flow_style=False)
+    dumper.emit(yaml.StreamStartEvent())
+    dumper.emit(yaml.DocumentStartEvent(explicit=False))
+    dumper.emit(yaml.MappingStartEvent(None, YAML_MAP_TAG, True, flow_style=False))
+
+    open_levels = []
+    for tree_num, subtree, item, level in branches:
+        while len(open_levels) > 0 and open_levels[-1] >= level:
+            open_levels.pop()
+            dumper.emit(yaml.MappingEndEvent())
+            dumper.emit(yaml.SequenceEndEvent())
+
+        _emit_data(dumper, tree_num)
+        value = value_fn(tree_num, item, level)
+        if _has_children(subtree, tree_num):
+            dumper.emit(yaml.SequenceStartEvent(None, YAML_SEQ_TAG, True, flow_style=False))
+            _emit_data(dumper, value)
+            dumper.emit(yaml.MappingStartEvent(None, YAML_MAP_TAG, True, flow_style=False))
+            open_levels.append(level)
+        else:
+            _emit_data(dumper, value)
+
+    while len(open_levels) > 0:
+        open_levels.pop()
+        dumper.emit(yaml.MappingEndEvent())
+        dumper.emit(yaml.SequenceEndEvent())
+    dumper.emit(yaml.MappingEndEvent())
+    dumper.emit(yaml.DocumentEndEvent(explicit=False))
+    dumper.emit(yaml.StreamEndEvent())
+
+
+def write_ndjson_tree(file, branches, record_fn):
+    """
+    Writes one JSON object per line for each branch: its tree_num, parent (the parent's tree_num, "" at the top)
+    and depth (0 at the top), followed by the keys of record_fn(tree_num, item, level). Values JSON can't hold are
+    written as strings.
+    """
+    encoder = json.JSONEncoder(default=str)
+    for tree_num, subtree, item, level in branches:
+        record = {
+            "tree_num": tree_num,
+            "parent": TreeIndex.parent_num_of(tree_num),
+            "depth": level,
+        }
+        record.update(record_fn(tree_num, item, level))
+        file.write(encoder.encode(record))
+        file.write("\n")
@@ -0,0 +1,389 @@
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from bom import FLATTEN_MODES, STRUCTURED_BOM_TYPES
+from helpers.diff_pipeline import STAGES, DiffJob, cache_from_config, run_diff_pipeline
+from item.common_filters import create_filters_from_config
+from item.item import Item
+from item.item_settings import ItemSettings
+from logger import LoggerManager
+from ui.config import Config
+
+logger = LoggerManager.get_logger()
+
+DEFAULT_CONFIG_PATH = "./settings.yaml"
+
+# manifest columns. left and right are required, the rest fall back to the config and command line
+MANIFEST_COLUMNS = ("left", "right", "left_type", "right_type", "output")
+
+
+def load_config(path):
+    """
+    Load settings.yaml and install its filters, primary prop and equivalent items, like the UI does before a diff.
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError("Settings file %s doesn't exist" % path)
+    config = Config(path)
+    config.configure_logging()
+
+    create_filters_from_config(config.filters)
+    Item.set_primary_prop(config.primary_prop)
+    Item.set_equivalent_mapping(config.equivalent_items)
+    return config
+
+
+def default_output_name(left_path, right_path):
+    # same default the UI offers in its save dialog
+    return "%s + %s diff.xlsx" % (
+        os.path.basename(left_path),
+        os.path.basename(right_path),
+    )
+
+
+def _bom_type(config_type, arg_type, side):
+    bom_type = arg_type if arg_type is not None else config_type
+    bom_type = (bom_type or "").lower()
+    if bom_type not in STRUCTURED_BOM_TYPES:
+        raise ValueError(
+            "Unknown %s BOM type '%s'. Choose from: %s"
+            % (side, bom_type, ", ".join(STRUCTURED_BOM_TYPES))
+        )
+    return bom_type
+
+
+def _cache(config, args):
+    if args.no_cache:
+        return None
+    return cache_from_config(config)
+
+
+def _show_common(config, args):
+    if args.show_common is None:
+        return bool(config.show_common)
+    return args.show_common
+
+
+def _columnar_diff(config, args):
+    if args.columnar is None:
+        return bool(config.columnar_diff)
+    return args.columnar
+
+
+def _skip_identical(config, args):
+    if args.skip_identical is None:
+        return bool(config.skip_identical_assemblies)
+    return args.skip_identical
+
+
+def _flatten_mode(config, args):
+    if args.flatten_mode is None:
+        return config.flatten_mode
+    return args.flatten_mode
+
+
+def make_job(
+    config,
+    left_path,
+    right_path,
+    left_type,
+    right_type,
+    output_path,
+    show_common,
+    cache,
+    columnar_diff,
+    skip_identical=None,
+    flatten_mode=None,
+):
+    # skip_identical and flatten_mode default to the config's, like the command line flags do
+    if skip_identical is None:
+        skip_identical = bool(config.skip_identical_assemblies)
+    if flatten_mode is None:
+        flatten_mode = config.flatten_mode
+    return DiffJob(
+        left_path,
+        _bom_type(config.left_type, left_type, "left"),
+        right_path,
+        _bom_type(config.right_type, right_type, "right"),
+        output_path,
+        list(config.diff_properties),
+        list(config.show_properties),
+        list(config.ignored_categories),
+        show_common,
+        cache,
+        columnar_diff,
+        skip_identical_assemblies=skip_identical,
+        flatten_mode=flatten_mode,
+    )
+
+
+def print_progress(stage, name):
+    print("[%s/%s] %s" % (stage + 1, len(STAGES), name))
+
+
+def run_diff(args):
+    config = load_config(args.config)
+    output_path = args.output
+    if output_path is None:
+        output_path = default_output_name(args.left, args.right)
+
+    job = make_job(
+        config,
+        args.left,
+        args.right,
+        args.left_type,
+        args.right_type,
+        output_path,
+        _show_common(config, args),
+        _cache(config, args),
+        _columnar_diff(config, args),
+        _skip_identical(config, args),
+        _flatten_mode(config, args),
+    )
+    run_diff_pipeline(job, None if args.quiet else print_progress)
+    print("Report saved to %s" % output_path)
+    if args.timings:
+        print(job.metrics.format())
+    return 0
+
+
+def read_manifest(path):
+    """
+    Reads a CSV manifest of BOM pairs with a header row. Relative paths are relative to the manifest.
+    """
+    base_dir = os.path.dirname(os.path.abspath(path))
+
+    def resolve(entry_path):
+        if not entry_path:
+            return entry_path
+        return os.path.normpath(os.path.join(base_dir, os.path.expanduser(entry_path)))
+
+    entries = []
+    with open(path, newline="") as file:
+        reader = csv.DictReader(file)
+        missing = [name for name in ("left", "right") if name not in (reader.fieldnames or [])]
+        if len(missing) > 0:
+            raise ValueError(
+                "Manifest %s is missing columns: %s" % (path, ", ".join(missing))
+            )
+        for row in reader:
+            entry = {name: (row.get(name) or "").strip() for name in MANIFEST_COLUMNS}
+            if not entry["left"] and not entry["right"]:
+                continue  # blank line
+            entry["left"] = resolve(entry["left"])
+            entry["right"] = resolve(entry["right"])
+            entry["output"] = resolve(entry["output"])
+            entries.append(entry)
+    return entries
+
+
+def _install_settings(settings, log_config):
+    LoggerManager.configure(**log_config)
+    settings.install()
+
+
+def _run_batch_job(job):
+    # runs in a worker process. Pairs are already spread across the pool, so each one loads its BOMs in turn
+    run_diff_pipeline(job, parallel_load=False)
+    return job.output_path
+
+
+def run_batch(args):
+    config = load_config(args.config)
+    show_common = _show_common(config, args)
+    cache = _cache(config, args)
+    columnar_diff = _columnar_diff(config, args)
+    skip_identical = _skip_identical(config, args)
+    flatten_mode = _flatten_mode(config, args)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    jobs = []
+    for entry in read_manifest(args.manifest):
+        output_path = entry["output"]
+        if not output_path:
+            output_path = os.path.join(
+                args.output_dir, default_output_name(entry["left"], entry["right"])
+            )
+        jobs.append(
+            make_job(
+                config,
+                entry["left"],
+                entry["right"],
+                entry["left_type"] or args.left_type,
+                entry["right_type"] or args.right_type,
+                output_path,
+                show_common,
+                cache,
+                columnar_diff,
+                skip_identical,
+                flatten_mode,
+            )
+        )
+
+    print("Diffing %s BOM pairs with %s workers" % (len(jobs), args.jobs))
+    failures = 0
+    with ProcessPoolExecutor(
+        max_workers=args.jobs,
+        initializer=_install_settings,
+        initargs=(ItemSettings.capture(), LoggerManager.get_config()),
+    ) as executor:
+        futures = {executor.submit(_run_batch_job, job): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                future.result()
+                print("ok\t%s + %s -> %s" % (job.left_path, job.right_path, job.output_path))
+            except BaseException as e:
+                failures += 1
+                logger.error("%s + %s: %s" % (job.left_path, job.right_path, str(e)))
+                print("FAILED\t%s + %s: %s" % (job.left_path, job.right_path, str(e)))
+
+    print("%s of %s BOM pairs diffed" % (len(jobs) - failures, len(jobs)))
+    return 0 if failures == 0 else 1
+
+
+def run_cache(args):
+    config = load_config(args.config)
+    cache = cache_from_config(config)
+    if cache is None:
+        print("The BOM cache is turned off (cache_dir is empty)")
+        return 0
+    if args.action == "clear":
+        cache.clear()
+        print("Cleared %s" % cache.directory)
+    else:
+        print(
+            "%s: %.1f of %s MB used"
+            % (cache.directory, cache.size() / (1024 * 1024), config.cache_size_mb)
+        )
+    return 0
+
+
+def _add_config_argument(parser):
+    parser.add_argument(
+        "--config",
+        default=DEFAULT_CONFIG_PATH,
+        help="settings file (default: %(default)s)",
+    )
+
+
+def _add_common_arguments(parser):
+    _add_config_argument(parser)
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="parse both BOMs even if they're in the cache",
+    )
+    parser.add_argument(
+        "--left-type",
+        choices=list(STRUCTURED_BOM_TYPES),
+        help="left BOM type (default: left_type from the config)",
+    )
+    parser.add_argument(
+        "--right-type",
+        choices=list(STRUCTURED_BOM_TYPES),
+        help="right BOM type (default: right_type from the config)",
+    )
+    show_common = parser.add_mutually_exclusive_group()
+    show_common.add_argument(
+        "--show-common",
+        dest="show_common",
+        action="store_true",
+        default=None,
+        help="list items that match on both sides (default: show_common from the config)",
+    )
+    show_common.add_argument(
+        "--hide-common", dest="show_common", action="store_false"
+    )
+    columnar = parser.add_mutually_exclusive_group()
+    columnar.add_argument(
+        "--columnar",
+        dest="columnar",
+        action="store_true",
+        default=None,
+        help="compare matched items column by column, for very large BOMs "
+        "(default: columnar_diff from the config)",
+    )
+    columnar.add_argument("--no-columnar", dest="columnar", action="store_false")
+    skip_identical = parser.add_mutually_exclusive_group()
+    skip_identical.add_argument(
+        "--skip-identical",
+        dest="skip_identical",
+        action="store_true",
+        default=None,
+        help="report matched assemblies that are identical all the way down as one match "
+        "(default: skip_identical_assemblies from the config)",
+    )
+    skip_identical.add_argument(
+        "--no-skip-identical", dest="skip_identical", action="store_false"
+    )
+    parser.add_argument(
+        "--flatten-mode",
+        choices=FLATTEN_MODES,
+        help="assembly quantities the assemblies only diff compares: as listed, or extended by the quantities "
+        "of the assemblies above them (default: flatten_mode from the config)",
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="bomdiff", description="Diff BOMs without the UI"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    diff_parser = subparsers.add_parser("diff", help="diff one pair of BOMs")
+    diff_parser.add_argument("left", help="left BOM (.csv or .xlsx)")
+    diff_parser.add_argument("right", help="right BOM (.csv or .xlsx)")
+    diff_parser.add_argument(
+        "-o", "--output", help="report path (default: '<left> + <right> diff.xlsx')"
+    )
+    diff_parser.add_argument(
+        "-q", "--quiet", action="store_true", help="don't print progress"
+    )
+    diff_parser.add_argument(
+        "--timings", action="store_true", help="print the time each stage took and counts of the work done"
+    )
+    _add_common_arguments(diff_parser)
+    diff_parser.set_defaults(fn=run_diff)
+
+    batch_parser = subparsers.add_parser(
+        "batch",
+        help="diff every pair of BOMs in a manifest",
+        description="The manifest is a CSV file with a header row and the columns %s. "
+        "left and right are required." % ", ".join(MANIFEST_COLUMNS),
+    )
+    batch_parser.add_argument("manifest", help="CSV manifest of BOM pairs")
+    batch_parser.add_argument(
+        "-d",
+        "--output-dir",
+        default=".",
+        help="where reports without an output column go (default: %(default)s)",
+    )
+    batch_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="worker processes (default: %(default)s)",
+    )
+    _add_common_arguments(batch_parser)
+    batch_parser.set_defaults(fn=run_batch)
+
+    cache_parser = subparsers.add_parser("cache", help="inspect or clear the parsed BOM cache")
+    cache_parser.add_argument("action", choices=("info", "clear"))
+    _add_config_argument(cache_parser)
+    cache_parser.set_defaults(fn=run_cache)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.fn(args)
+    except BaseException as e:
+        logger.error(str(e), exc_info=True)
+        print("Error: %s" % str(e), file=sys.stderr)
+        return 1
@@ -0,0 +1,283 @@
+import concurrent.futures
+import logging
+import queue
+import threading
+
+import metrics
+from bom import (
+    FLAT_BOM_TYPES,
+    RAW_QUANTITIES,
+    STRUCTURED_BOM_TYPES,
+    BomCache,
+    BomLoader,
+    StructuredBOM,
+    load_bom,
+)
+from logger import LoggerManager
+
+logger = LoggerManager.get_logger()
+
+PARSE_LEFT = 0
+PARSE_RIGHT = 1
+STRUCTURED_DIFF = 2
+ASSEMBLY_DIFF = 3
+WRITE_XLSX = 4
+
+STAGES = (
+    "Parsing left BOM",
+    "Parsing right BOM",
+    "Structured diff",
+    "Assembly diff",
+    "Writing xlsx",
+)
+
+# message kinds posted by DiffWorker
+PROGRESS = "progress"
+DONE = "done"
+CANCELLED = "cancelled"
+ERROR = "error"
+
+
+class DiffCancelled(Exception):
+    pass
+
+
+class DiffJob:
+    """
+    Everything the pipeline needs to produce a report. Built on the main thread so the worker never touches the UI.
+    """
+
+    def __init__(
+        self,
+        left_path,
+        left_type,
+        right_path,
+        right_type,
+        output_path,
+        diff_props,
+        show_props,
+        ignored_categories,
+        show_common,
+        cache=None,
+        columnar_diff=False,
+        session=None,
+        skip_identical_assemblies=False,
+        flatten_mode=RAW_QUANTITIES,
+    ):
+        self.left_path = left_path
+        self.left_type = left_type
+        self.right_path = right_path
+        self.right_type = right_type
+        self.output_path = output_path
+        self.diff_props = diff_props
+        self.show_props = show_props
+        self.ignored_categories = ignored_categories
+        self.show_common = show_common
+        # BomCache for parsed BOMs, or None to always parse
+        self.cache = cache
+        self.columnar_diff = columnar_diff
+        # IncrementalDiff kept between runs, or None to diff from scratch every time
+        self.session = session
+        self.skip_identical_assemblies = skip_identical_assemblies
+        # quantities the assemblies only diff compares, one of bom.FLATTEN_MODES
+        self.flatten_mode = flatten_mode
+        # RunMetrics of the last run_diff_pipeline of the job: time per stage and counters
+        self.metrics = None
+
+    def apply_settings(self, bom):
+        bom.set_diff_props(self.diff_props)
+        bom.set_show_props(self.show_props)
+        bom.set_ignored_categories(self.ignored_categories)
+        bom.set_columnar_diff(self.columnar_diff)
+        if isinstance(bom, StructuredBOM):
+            bom.set_skip_identical_assemblies(self.skip_identical_assemblies)
+            bom.set_flatten_mode(self.flatten_mode)
+
+
+def cache_from_config(config):
+    cache_dir = config.get_cache_dir()
+    if cache_dir is None:
+        return None
+    return BomCache(cache_dir, config.cache_size_mb * 1024 * 1024)
+
+
+def _check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise DiffCancelled()
+
+
+def _wait_for(future, cancel_event, poll_interval=0.1):
+    # waits on a load in another process, checking for cancellation while it runs
+    while True:
+        done, _ = concurrent.futures.wait([future], timeout=poll_interval)
+        if len(done) > 0:
+            return future.result()
+        _check_cancelled(cancel_event)
+
+
+def _cancellable(rows, cancel_event):
+    for row in rows:
+        _check_cancelled(cancel_event)
+        yield row
+
+
+def _assemblies_only(bom, flat_cls):
+    assem_bom = bom.from_tree(bom.name, bom.assemblies_only())
+    if bom.flatten_mode == RAW_QUANTITIES:
+        # each assembly with the quantity of its first occurrence
+        return flat_cls.from_list(assem_bom.name, assem_bom.flattened)
+    # each assembly with its total, so the diff compares how many of it the whole BOM needs
+    return assem_bom.to_flat(flat_cls, bom.flatten_mode)
+
+
+def _get_assemblies_only(job, bom, flat_cls):
+    if job.session is None:
+        return _assemblies_only(bom, flat_cls)
+    return job.session.assemblies_only(bom, lambda structured_bom: _assemblies_only(structured_bom, flat_cls))
+
+
+def _load_boms(job, start_stage, cancel_event, parallel_load):
+    left_cls = STRUCTURED_BOM_TYPES[job.left_type]
+    right_cls = STRUCTURED_BOM_TYPES[job.right_type]
+    left_bom = None
+    right_bom = None
+    if job.session is not None:
+        # BOMs whose files haven't changed since the last run are used as they are
+        left_key = job.session.source_key(left_cls, job.left_path)
+        right_key = job.session.source_key(right_cls, job.right_path)
+        left_bom = job.session.get_bom(left_key)
+        right_bom = job.session.get_bom(right_key)
+
+    if parallel_load and left_bom is None and right_bom is None:
+        left_bom, right_bom = _load_boms_in_parallel(job, start_stage, cancel_event)
+    else:
+        start_stage(PARSE_LEFT)
+        if left_bom is None:
+            left_bom = load_bom(left_cls, job.left_path, job.cache)
+        start_stage(PARSE_RIGHT)
+        if right_bom is None:
+            right_bom = load_bom(right_cls, job.right_path, job.cache)
+
+    if job.session is not None:
+        job.session.keep_boms({left_key: left_bom, right_key: right_bom})
+    return left_bom, right_bom
+
+
+def _load_boms_in_parallel(job, start_stage, cancel_event):
+    # the right BOM loads in a worker process while the left one is parsed here
+    start_stage(PARSE_LEFT)
+    loader = BomLoader(cache=job.cache)
+    try:
+        right_future = loader.submit(STRUCTURED_BOM_TYPES[job.right_type], job.right_path)
+        left_bom = load_bom(STRUCTURED_BOM_TYPES[job.left_type], job.left_path, job.cache)
+
+        start_stage(PARSE_RIGHT)
+        right_bom = _wait_for(right_future, cancel_event)
+    except BaseException:
+        loader.shutdown(wait=False)
+        raise
+    loader.shutdown()
+    return left_bom, right_bom
+
+
+def run_diff_pipeline(job, progress_fn=None, cancel_event=None, parallel_load=True):
+    """
+    Load both BOMs, diff them structured and assemblies only, and save both reports to job.output_path.
+    progress_fn(stage index, stage name) is called as each stage starts. Raises DiffCancelled if cancel_event
+    is set between stages or while the workbook is being written. Nothing is saved in that case.
+    parallel_load=False parses both BOMs in this process, for callers that already run pipelines in parallel.
+    With job.session, only what changed since the session's last run is parsed and diffed again.
+    Time spent per stage and counts of the work done are left in job.metrics, and logged.
+    """
+    job.metrics = metrics.start_run()
+    try:
+        return _run_diff_pipeline(job, progress_fn, cancel_event, parallel_load)
+    finally:
+        metrics.finish_run()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Diff timings:\n%s" % job.metrics.format())
+
+
+def _run_diff_pipeline(job, progress_fn, cancel_event, parallel_load):
+    def start_stage(stage):
+        _check_cancelled(cancel_event)
+        logger.debug(STAGES[stage])
+        job.metrics.start_stage(STAGES[stage])
+        if progress_fn is not None:
+            progress_fn(stage, STAGES[stage])
+
+    left_bom, right_bom = _load_boms(job, start_stage, cancel_event, parallel_load)
+
+    job.apply_settings(left_bom)
+    job.apply_settings(right_bom)
+
+    logger.debug("Diff props: %s" % left_bom.item_diff_names)
+    logger.debug("Show props: %s" % left_bom.item_show_names)
+
+    start_stage(STRUCTURED_DIFF)
+    if job.session is not None:
+        diff_report = job.session.diff(left_bom, right_bom)
+    else:
+        diff_report = left_bom.diff(right_bom)
+
+    start_stage(ASSEMBLY_DIFF)
+    left_assem_bom = _get_assemblies_only(job, left_bom, FLAT_BOM_TYPES[job.left_type])
+    job.apply_settings(left_assem_bom)
+    right_assem_bom = _get_assemblies_only(job, right_bom, FLAT_BOM_TYPES[job.right_type])
+    job.apply_settings(right_assem_bom)
+    toplevel_diff_report = left_assem_bom.diff(right_assem_bom)
+
+    start_stage(WRITE_XLSX)
+    # the report writer pulls in openpyxl, which is slow to import, so it's only imported by the first diff
+    from .xlsx_converter import rows_to_xlsx
+
+    rows = left_bom.iter_diff_report_table(diff_report, right_bom, job.show_common)
+    workbook = rows_to_xlsx(_cancellable(rows, cancel_event), "Diff", path=None)
+    rows = left_assem_bom.iter_diff_report_table(
+        toplevel_diff_report, right_assem_bom, job.show_common
+    )
+    rows_to_xlsx(
+        _cancellable(rows, cancel_event),
+        "Assemblies only",
+        path=None,
+        workbook=workbook,
+    )
+
+    _check_cancelled(cancel_event)
+    logger.debug("Saving workbook")
+    job.metrics.start_stage("Saving workbook")
+    workbook.save(job.output_path)
+    return job.output_path
+
+
+class DiffWorker(threading.Thread):
+    """
+    Runs run_diff_pipeline off the Tk thread. Progress and the outcome are posted to messages as
+    (kind, value) tuples for the UI to poll:
+        (PROGRESS, (stage index, stage name)), (DONE, output path), (CANCELLED, None), (ERROR, exception)
+    """
+
+    def __init__(self, job):
+        super(DiffWorker, self).__init__(daemon=True)
+        self.job = job
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        try:
+            output_path = run_diff_pipeline(
+                self.job, self._post_progress, self.cancel_event
+            )
+            self.messages.put((DONE, output_path))
+        except DiffCancelled:
+            logger.debug("Diff cancelled")
+            self.messages.put((CANCELLED, None))
+        except BaseException as e:
+            logger.error(str(e), exc_info=True)
+            self.messages.put((ERROR, e))
+
+    def _post_progress(self, stage, name):
+        self.messages.put((PROGRESS, (stage, name)))
+
+    def cancel(self):
+        self.cancel_event.set()
@@ -6,7 +6,7 @@ import yaml
 from bom import PropelStructured
 from bom.solidworks_bom import SolidworksStructured
 from bom.structured_bom import StructuredBOM
-from item import CODE_CATEGORIES, NAME_CATEGORIES
+from item import get_category_tables
 from logger import LoggerManager
 
 logger = LoggerManager.get_logger()
@@ -85,7 +85,7 @@ def generate_mcmaster_list(solid_bom, propel_bom):
 
             propel_item.manufacturer = "McMaster-Carr"
             propel_item.mfg_number = item.mfg_number
-            propel_item.category = CODE_CATEGORIES[propel_item.category]
+            propel_item.category = get_category_tables().code[propel_item.category]
             try:
                 propel_item.revision = propel_item.convert_rev(
                     int(propel_item.revision) + 1
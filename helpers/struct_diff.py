@@ -1,16 +1,17 @@
-import openpyxl
-
 from bom import PropelStructured, SolidworksBOM
 from bom.propel_bom import PropelBOM
 from bom.solidworks_bom import SolidworksStructured
 
 from .directory_manager import *
-from .xlsx_converter import report_to_xlsx
 
 
 def report_struct_diff(
-    solid_bom: SolidworksStructured, propel_bom: PropelStructured, show_common=False
+    solid_bom: SolidworksStructured,
+    propel_bom: PropelStructured,
+    show_common=False,
+    session=None,
 ):
+    # session is an IncrementalDiff kept between calls, so only what changed since the last call is diffed again
     # solid_bom.flattened_to_csv("output_boms/solidworks_flat.csv")
     solid_bom.to_json(OUTPUT_BOMS + "/solidworks.json")
     solid_assem_bom = solid_bom.from_tree(solid_bom.name, solid_bom.assemblies_only())
@@ -31,7 +32,10 @@ def report_struct_diff(
         propel_assem_bom.name, propel_assem_bom.flattened
     )
 
-    diff_report = solid_bom.diff(propel_bom)
+    if session is not None:
+        diff_report = session.diff(solid_bom, propel_bom)
+    else:
+        diff_report = solid_bom.diff(propel_bom)
     # with open(OUTPUT_BOMS + "/diff-report.txt", 'w') as file:
     #     file.write(solid_bom.diff_report_to_str(diff_report, propel_bom, show_common))
 
@@ -43,15 +47,15 @@ def report_struct_diff(
         solid_bom.name,
         propel_bom.name,
     )
-    report, color_mapping = solid_bom.diff_report_to_table(
-        diff_report, propel_bom, show_common
-    )
-    workbook = report_to_xlsx(report, color_mapping, "Structured Diff", path=None)
+    from .xlsx_converter import rows_to_xlsx
+
+    rows = solid_bom.iter_diff_report_table(diff_report, propel_bom, show_common)
+    workbook = rows_to_xlsx(rows, "Structured Diff", path=None)
 
     toplevel_diff_report = solid_assem_bom.diff(propel_assem_bom)
-    report, color_mapping = solid_assem_bom.diff_report_to_table(
+    rows = solid_assem_bom.iter_diff_report_table(
         toplevel_diff_report, propel_assem_bom, show_common
     )
-    report_to_xlsx(report, color_mapping, "Top Level", path=None, workbook=workbook)
+    rows_to_xlsx(rows, "Top Level", path=None, workbook=workbook)
 
     workbook.save(output_path)
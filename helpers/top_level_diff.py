@@ -1,5 +1,4 @@
 from bom.bom import BOM
-from .xlsx_converter import report_to_xlsx
 from .directory_manager import *
 
 
@@ -9,6 +8,8 @@ def report_top_level_diff(bom1: BOM, bom2: BOM, print_report=True, show_common=T
         report_str = bom1.diff_report_to_str(diff_report, bom2, show_common, skip_attrs=("revision",))
         print(report_str)
 
-    report, color_mapping = bom1.diff_report_to_table(diff_report, bom2, show_common)
+    from .xlsx_converter import rows_to_xlsx
+
+    rows = bom1.iter_diff_report_table(diff_report, bom2, show_common)
     output_path = OUTPUT_FORMS + "/%s + %s diff.xlsx" % (bom1.name, bom2.name)
-    return report_to_xlsx(report, color_mapping, "Diff", output_path)
+    return rows_to_xlsx(rows, "Diff", output_path)
@@ -1,9 +1,12 @@
+import itertools
+
 import openpyxl
 import openpyxl.styles
 import openpyxl.utils
+import metrics
 from bom.structured_bom import TableColors
 
-from openpyxl.worksheet.worksheet import Worksheet
+from openpyxl.cell import WriteOnlyCell
 
 # from openpyxl.styles import Border, Side, PatternFill, Font, GradientFill, Alignment, colors
 
@@ -22,6 +25,9 @@ code_to_color = {
 code_to_fill = {key: openpyxl.styles.fills.PatternFill(patternType='solid', fgColor=color) for key, color in
                 code_to_color.items()}
 
+# every cell of a color shares one named style instead of carrying its own fill
+code_to_style_name = {key: "BOM Diff %s" % key for key in code_to_color}
+
 name_to_width = {
     "Item Code": 14,
     "Rev": 4,
@@ -31,40 +37,57 @@ name_to_width = {
 }
 
 
-def report_to_xlsx(report, color_mapping, sheet_name, path=None, workbook=None):
-    if workbook is None:
-        workbook = openpyxl.Workbook()
-        worksheet = workbook.active
-        worksheet.title = sheet_name
-    else:
-        worksheet = workbook.create_sheet(sheet_name)
+def create_workbook():
+    # write-only workbooks stream rows to disk so memory stays flat as the report grows.
+    # They can only be saved once
+    return openpyxl.Workbook(write_only=True)
 
-    assert len(color_mapping) == len(report), "%s != %s" % (len(color_mapping), len(report))
-    for row_index in range(len(report)):
-        row = report[row_index]
-        colors = color_mapping[row_index]
-        assert len(row) == len(colors), "%s != %s @ %s" % (len(row), len(colors), row_index)
 
-        for col_index in range(len(row)):
-            cell_value = row[col_index]
-            color_code = colors[col_index]
+def _add_named_styles(workbook):
+    for code, style_name in code_to_style_name.items():
+        if style_name not in workbook.named_styles:
+            style = openpyxl.styles.NamedStyle(name=style_name, fill=code_to_fill[code])
+            workbook.add_named_style(style)
 
-            cell = worksheet.cell(row=row_index + 1, column=col_index + 1)
-            cell.value = cell_value
-            cell.fill = code_to_fill[color_code]
 
+def rows_to_xlsx(rows, sheet_name, path=None, workbook=None):
+    """
+    rows is an iterable of (row, color row) pairs, such as BOM.iter_diff_report_table. The second row holds the
+    column labels and is used to size the columns.
+    """
+    if workbook is None:
+        workbook = create_workbook()
+    worksheet = workbook.create_sheet(sheet_name)
+    _add_named_styles(workbook)
 
-    widths = []
-    label_row = report[1]
-    for col_index in range(len(label_row)):
-        label_key = label_row[col_index]
-        width = name_to_width.get(label_key, 10)
-        widths.append(width)
+    # column widths have to be set before the first row is written
+    rows = iter(rows)
+    title_rows = list(itertools.islice(rows, 2))
+    if len(title_rows) == 2:
+        label_row = title_rows[1][0]
+        for col_index in range(len(label_row)):
+            width = name_to_width.get(label_row[col_index], 10)
+            worksheet.column_dimensions[openpyxl.utils.get_column_letter(col_index + 1)].width = width
 
-    for index, width in enumerate(widths):
-        worksheet.column_dimensions[openpyxl.utils.get_column_letter(index + 1)].width = width
+    num_cells = 0
+    for row_index, (row, colors) in enumerate(itertools.chain(title_rows, rows)):
+        assert len(row) == len(colors), "%s != %s @ %s" % (len(row), len(colors), row_index)
+
+        cells = []
+        for cell_value, color_code in zip(row, colors):
+            cell = WriteOnlyCell(worksheet, value=cell_value)
+            cell.style = code_to_style_name[color_code]
+            cells.append(cell)
+        worksheet.append(cells)
+        num_cells += len(cells)
+    metrics.count("cells written", num_cells)
 
     if path is not None:
         workbook.save(path)
 
     return workbook
+
+
+def report_to_xlsx(report, color_mapping, sheet_name, path=None, workbook=None):
+    assert len(color_mapping) == len(report), "%s != %s" % (len(color_mapping), len(report))
+    return rows_to_xlsx(zip(report, color_mapping), sheet_name, path, workbook)
@@ -1,5 +1,18 @@
-from .categories import get_categories, lower_categories
+from .categories import get_categories, get_category_tables, lower_categories
 
-CODE_CATEGORIES, NAME_CATEGORIES = get_categories()
-CODE_CATEGORIES_LOWER = lower_categories(CODE_CATEGORIES)
-NAME_CATEGORIES_LOWER = lower_categories(NAME_CATEGORIES)
+# module attribute -> CategoryTables field. The tables are only read when one of these is first used
+_CATEGORY_TABLES = {
+    "CODE_CATEGORIES": "code",
+    "NAME_CATEGORIES": "name",
+    "CODE_CATEGORIES_LOWER": "code_lower",
+    "NAME_CATEGORIES_LOWER": "name_lower",
+}
+
+
+def __getattr__(name):
+    if name not in _CATEGORY_TABLES:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    tables = get_category_tables()
+    for attr_name, field in _CATEGORY_TABLES.items():
+        globals()[attr_name] = getattr(tables, field)
+    return globals()[name]
@@ -1,12 +1,36 @@
-import yaml
+from collections import namedtuple
+
+CategoryTables = namedtuple("CategoryTables", ["code", "name", "code_lower", "name_lower"])
+
+_tables = None
 
 
 def get_categories(path="categories.yaml"):
+    import yaml
+
     with open(path) as file:
         code_categories = yaml.safe_load(file)
     name_categories = {v: k for k, v in code_categories.items()}
     return code_categories, name_categories
 
+
 def lower_categories(categories):
     # map lowered keys to corresponding normal keys
-    return {k.lower(): k for k, v in categories.items()}
\ No newline at end of file
+    return {k.lower(): k for k, v in categories.items()}
+
+
+def get_category_tables():
+    """
+    CategoryTables of categories.yaml: code -> name, name -> code and both with lowered keys. The file is read on
+    first use rather than at startup.
+    """
+    global _tables
+    if _tables is None:
+        code_categories, name_categories = get_categories()
+        _tables = CategoryTables(
+            code_categories,
+            name_categories,
+            lower_categories(code_categories),
+            lower_categories(name_categories),
+        )
+    return _tables
@@ -1,6 +1,6 @@
 import re
 
-from . import NAME_CATEGORIES
+from .categories import get_category_tables
 from .header_filter import HeaderFilter
 
 # description = HeaderFilter("description", "Description", str, False)
@@ -27,8 +27,9 @@ from .header_filter import HeaderFilter
 
 def convert_cat(x):
     if type(x) == str and len(x) > 0:
-        if x in NAME_CATEGORIES:
-            return NAME_CATEGORIES[x]
+        name_categories = get_category_tables().name
+        if x in name_categories:
+            return name_categories[x]
         else:
             return x
     else:
@@ -123,6 +124,8 @@ def is_revision(x):
 
 
 COMMON_FILTERS = {}
+# bumped whenever COMMON_FILTERS is rebuilt so lookups derived from it know to rebuild too
+FILTERS_VERSION = 0
 FILTER_MAP = {
     "__is_qty__": is_qty,
     "__is_propel_number__": is_propel_number,
@@ -144,7 +147,7 @@ PARSER_MAP = {
 
 
 def create_filters_from_config(config_filters):
-    global COMMON_FILTERS
+    global COMMON_FILTERS, FILTERS_VERSION
     equivalent_hfs = {}
     for name, config_filter in config_filters.items():
         filters = []
@@ -166,6 +169,23 @@ def create_filters_from_config(config_filters):
         equivalent_to_hfs = [COMMON_FILTERS[name] for name in equivalent_to]
         hf.add_equivalent_hfs(*equivalent_to_hfs)
 
+    FILTERS_VERSION += 1
+
+
+def install_common_filters(common_filters):
+    # replaces the filters wholesale, e.g. with a copy taken in another process
+    global COMMON_FILTERS, FILTERS_VERSION
+    COMMON_FILTERS = dict(common_filters)
+    FILTERS_VERSION += 1
+
+
+def get_common_filters_by_name():
+    return dict(COMMON_FILTERS)
+
+
+def get_filters_version():
+    return FILTERS_VERSION
+
 
 def get_common_filters():
     filters = []
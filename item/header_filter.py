@@ -1,3 +1,6 @@
+_MISSING = object()
+
+
 class HeaderFilter:
     def __init__(self, attribute_name, filters, parser_fn, is_critical=False):
         self.attribute_name = attribute_name
@@ -6,19 +9,56 @@ class HeaderFilter:
         self.is_critical = is_critical
         self.equivalent_hfs = []
 
+        # string filters are compared case-insensitively, so they're case-folded once here
+        self._lowered_filters = set()
+        self._callable_filters = []
+        for supplied_filter in filters:
+            if type(supplied_filter) == str:
+                self._lowered_filters.add(supplied_filter.lower())
+            elif callable(supplied_filter):
+                self._callable_filters.append(supplied_filter)
+
+        # header entry -> result. Callable filters only run once per distinct entry
+        self._matches = {}
+
     def filter_fn(self, header_entry):
+        result = self._matches.get(header_entry)
+        if result is None:
+            result = self._match(header_entry)
+            self._matches[header_entry] = result
+        return result
+
+    def _match(self, header_entry):
         if header_entry == self.attribute_name:
             return True
-        for supplied_filter in self._supplied_filters:
-            if type(supplied_filter) == str:
-                if header_entry.lower() == supplied_filter.lower():
-                    return True
-            elif callable(supplied_filter):
-                if supplied_filter(header_entry):
-                    return True
+        if len(self._lowered_filters) > 0:
+            if header_entry.lower() in self._lowered_filters:
+                return True
+        for supplied_filter in self._callable_filters:
+            if supplied_filter(header_entry):
+                return True
 
         return False
 
+    def get_lowered_filters(self):
+        return self._lowered_filters
+
+    def get_signature(self):
+        # what this filter matches and how it parses, as plain values. Functions are named by module and qualname
+        def name_of(fn):
+            return "%s.%s" % (fn.__module__, fn.__qualname__)
+
+        filters = self._supplied_filters
+        if type(filters) == str:
+            filters = [filters]
+        return (
+            self.attribute_name,
+            tuple(name_of(f) if callable(f) else f for f in filters),
+            name_of(self.parser_fn),
+            self.is_critical,
+            tuple(hf.attribute_name for hf in self.equivalent_hfs),
+        )
+
     def add_equivalent_hfs(self, *header_filters):
         for hf in header_filters:
             if not isinstance(hf, self.__class__):
@@ -38,3 +78,36 @@ class HeaderFilter:
                     return True
 
         return False
+
+
+class HeaderFilterLookup:
+    """
+    Maps a header or display name to the first HeaderFilter in header_filters that accepts it.
+    Every name the filters know about (attribute names and case-folded string filters) is resolved up front.
+    Anything else is resolved on first use and remembered.
+    """
+
+    def __init__(self, header_filters):
+        self.header_filters = list(header_filters)
+        self._matches = {}
+        for header_filter in self.header_filters:
+            self.match(header_filter.attribute_name)
+            for name in header_filter.get_lowered_filters():
+                self.match(name)
+
+    def match(self, name):
+        header_filter_match = self._matches.get(name, _MISSING)
+        if header_filter_match is _MISSING:
+            header_filter_match = None
+            for header_filter in self.header_filters:
+                if header_filter.filter_fn(name):
+                    header_filter_match = header_filter
+                    break
+            self._matches[name] = header_filter_match
+        return header_filter_match
+
+    def get_attribute_name(self, name):
+        header_filter_match = self.match(name)
+        if header_filter_match is None:
+            return None
+        return header_filter_match.attribute_name
@@ -0,0 +1,71 @@
+class HeaderPlan:
+    """
+    Header resolution for one file. Matching header names to header filters, finding the primary prop and
+    checking for critical attributes only depends on the header, so it's done once here and reused by every row.
+    """
+
+    def __init__(self, item_cls, header, primary_prop_name):
+        self.item_cls = item_cls
+        self.header = header
+        self.primary_prop_name = primary_prop_name
+        self.primary_prop = None
+
+        # [(attribute name, parser, [(column index, header name), ...]), ...]
+        # an attribute takes its value from the first of its columns that the row is long enough to have
+        self.columns = []
+
+        template = item_cls(header)
+        self._compile(template)
+
+    def _compile(self, template):
+        critical_keys_found = {
+            f.attribute_name: False for f in template.header_filters if f.is_critical
+        }
+        primary_header_filter = template.get_header_filter_match(self.primary_prop_name)
+        attribute_columns = {}
+
+        for name, index in self.header.items():
+            header_filter_match = template.get_header_filter_match(name)
+            if header_filter_match is None:
+                continue
+            attr_name = header_filter_match.attribute_name
+
+            if self.primary_prop is None:
+                if (
+                    primary_header_filter is not None
+                    and primary_header_filter == header_filter_match
+                ):
+                    self.primary_prop = primary_header_filter.attribute_name
+
+            if attr_name in critical_keys_found:
+                critical_keys_found[attr_name] = True
+
+            if attr_name not in attribute_columns:
+                attribute_columns[attr_name] = []
+                self.columns.append(
+                    (attr_name, header_filter_match.parser_fn, attribute_columns[attr_name])
+                )
+            attribute_columns[attr_name].append((index, name))
+
+        if self.primary_prop is None:
+            raise ValueError(
+                "Primary comparison attribute '%s' not found in header '%s'"
+                % (self.primary_prop_name, self.header)
+            )
+
+        if not all(critical_keys_found.values()):
+            error_str = ""
+            for key, found in critical_keys_found.items():
+                if not found:
+                    error_str += "\t" + key + "\n"
+            raise ValueError(
+                "Critical attributes not found in header '%s':\n%s"
+                % (self.header, error_str)
+            )
+
+    def is_valid_for(self, item_cls, header, primary_prop_name):
+        return (
+            self.item_cls is item_cls
+            and self.header is header
+            and self.primary_prop_name == primary_prop_name
+        )
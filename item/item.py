@@ -1,13 +1,57 @@
-from .common_filters import get_common_filters, is_propel_number, remove_newlines
+import logging
+
+from logger import LoggerManager
+
+from .common_filters import (
+    get_common_filters,
+    get_filters_version,
+    is_propel_number,
+    remove_newlines,
+)
+from .header_filter import HeaderFilterLookup
+from .header_plan import HeaderPlan
+
+logger = LoggerManager.get_logger()
 
 
 class Item:
+    # the attributes every item has live in slots. Attributes that only some settings define (from the filter
+    # config) still go in __dict__, which is only allocated for items that have one
+    __slots__ = (
+        "header",
+        "propel_number",
+        "item_code",
+        "item_id",
+        "category",
+        "revision",
+        "description",
+        "quantity",
+        "primary_prop",
+        "_key",
+        "_key_version",
+        "__dict__",
+    )
+
     PROPEL_NUM_DEFAULT = "XXXXXX"
     CATEGORY_DEFAULT = "XXX"
     REVISION_DEFAULT = "XX"
     item_primary_prop = "propel_number"
     equivalent_items = []
 
+    # parsed primary value -> canonical primary value. Built lazily from equivalent_items and
+    # thrown away whenever the mapping or the primary prop changes
+    _equivalence_index = None
+    # replaced with a new token on every change. A token never compares identical to its unpickled copy, so
+    # keys cached in another process (or in the BOM cache) are always recomputed
+    _equivalence_version = object()
+
+    # class -> (filters version, HeaderFilterLookup). Every instance of a class is built with the same
+    # header filters, so one memoized lookup serves all of them
+    _filter_lookups = {}
+
+    # class -> (filters version, header filters). Every item of a class shares one list
+    _class_header_filters = {}
+
     def __init__(self, header):
         self.header = header
         self.propel_number = self.PROPEL_NUM_DEFAULT
@@ -19,17 +63,44 @@ class Item:
         self.quantity = 0
         self.primary_prop = "propel_number"
 
-        self.header_filters = (
-            get_common_filters()
-        )  # match strings/functions when looking for attribute in header
+        # canonical key cache. Valid while _key_version is Item._equivalence_version
+        self._key = None
+        self._key_version = None
 
     @classmethod
     def set_equivalent_mapping(cls, equivalent_items):
         cls.equivalent_items = equivalent_items
+        cls._reset_equivalence_index()
 
     @classmethod
     def set_primary_prop(cls, new_prop):
         cls.item_primary_prop = new_prop
+        cls._reset_equivalence_index()
+
+    @staticmethod
+    def _reset_equivalence_index():
+        # cached item keys compare their version against this one, so replacing it invalidates all of them
+        Item._equivalence_index = None
+        Item._equivalence_version = object()
+
+    @classmethod
+    def create_header_filters(cls):
+        # match strings/functions when looking for attribute in header
+        return get_common_filters()
+
+    @classmethod
+    def get_class_header_filters(cls):
+        version = get_filters_version()
+        entry = Item._class_header_filters.get(cls)
+        if entry is None or entry[0] != version:
+            entry = (version, cls.create_header_filters())
+            Item._class_header_filters[cls] = entry
+        return entry[1]
+
+    @property
+    def header_filters(self):
+        # shared by every item of the class. Don't modify it
+        return self.get_class_header_filters()
 
     def _check_for_item_code(self):
         # check if the found propel number is actually an item code
@@ -59,7 +130,9 @@ class Item:
         #     print("WARNING: invalid category: %s" % category)
         if not is_propel_number(propel_number):
             # raise ValueError("Invalid propel number: %s" % propel_number)
-            print("WARNING: Invalid propel number: %s" % propel_number)
+            # once per item, so the message is only built when it's logged
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Invalid propel number: %s" % propel_number)
         # if not self.is_revision(revision):
         #     print("WARNING: invalid revision: %s" % revision)
 
@@ -91,83 +164,49 @@ class Item:
             self.item_code = "%s-%s" % (self.category, self.propel_number)
         self.item_id = "%s-%s" % (self.item_code, self.revision)
 
+    def get_filter_lookup(self):
+        version = get_filters_version()
+        entry = Item._filter_lookups.get(self.__class__)
+        if entry is None or entry[0] != version:
+            entry = (version, HeaderFilterLookup(self.header_filters))
+            Item._filter_lookups[self.__class__] = entry
+        return entry[1]
+
     def get_header_filter_match(self, name):
-        header_filter_match = None
-        for header_filter in self.header_filters:
-            if bool(header_filter.filter_fn(name)):
-                header_filter_match = header_filter
-                break
-        return header_filter_match
+        return self.get_filter_lookup().match(name)
 
     @classmethod
-    def from_line(cls, header, line, primary_prop_name=None):
+    def compile_header(cls, header, primary_prop_name=None):
         if primary_prop_name is None:
             primary_prop_name = cls.item_primary_prop
+        return HeaderPlan(cls, header, primary_prop_name)
+
+    @classmethod
+    def from_line(cls, header, line, primary_prop_name=None, plan=None):
+        if plan is None:
+            plan = cls.compile_header(header, primary_prop_name)
         # assert len(header) == len(line), "%s != %s" % (len(header), len(line))
         obj = cls(header)
+        obj.primary_prop = plan.primary_prop
 
-        critical_keys_found = {
-            f.attribute_name: False for f in obj.header_filters if f.is_critical
-        }
-        attributes_set = set()
-        primary_prop_found = False
-        primary_header_filter = obj.get_header_filter_match(primary_prop_name)
-
-        for name, index in header.items():
-            header_filter_match = obj.get_header_filter_match(name)
-            if (
-                header_filter_match is None
-                or header_filter_match.attribute_name in attributes_set
-            ):
-                continue
-            attr_name = header_filter_match.attribute_name
-
-            if not primary_prop_found:
-                if (
-                    primary_header_filter is not None
-                    and primary_header_filter == header_filter_match
-                ):
-                    primary_prop_found = True
-                    obj.primary_prop = primary_header_filter.attribute_name
-                    # print("Selected primary prop:", obj.primary_prop)
-
-            if attr_name in critical_keys_found:
-                critical_keys_found[attr_name] = True
-            if index >= len(line):
-                obj.__dict__[attr_name] = None
+        line_length = len(line)
+        for attr_name, parser_fn, columns in plan.columns:
+            for index, name in columns:
+                if index < line_length:
+                    break
+            else:
+                setattr(obj, attr_name, None)
                 continue
             try:
                 element = remove_newlines(line[index])
-                value = header_filter_match.parser_fn(element)
-                # if header_key in obj.__dict__ and obj.__dict__[header_key] != value:
-                #     print("%s already found. Overriding value" % header_key)
-                #     print(obj.__dict__[header_key], value)
-                obj.__dict__[attr_name] = value
-                attributes_set.add(attr_name)
+                setattr(obj, attr_name, parser_fn(element))
             except ValueError as e:
-                obj.__dict__[attr_name] = None
-                # print(name, line, e)
+                setattr(obj, attr_name, None)
                 raise ValueError(
                     "Failed to parse for attribute '%s' with matched header name '%s': %s"
                     % (attr_name, name, str(e))
                 )
 
-        if not primary_prop_found:
-            raise ValueError(
-                "Primary comparison attribute '%s' not found in header '%s'"
-                % (primary_prop_name, header)
-            )
-
-        if not all(critical_keys_found.values()):
-            error_str = ""
-            for key, found in critical_keys_found.items():
-                if not found:
-                    error_str += "\t" + key + "\n"
-            raise ValueError(
-                "Critical attributes not found in header '%s':\n%s"
-                % (header, error_str)
-            )
-
         obj._check_for_item_code()
 
         return obj
@@ -196,30 +235,47 @@ class Item:
         parsed_equivalence_mapping = []
         for items in self.equivalent_items:
             if not (type(items) == list or type(items) == tuple):
-                print("Ignoring equivalence item that isn't a list: %s" % items)
+                logger.warning("Ignoring equivalence item that isn't a list: %s" % (items,))
                 continue
             equivalence = []
             for value in items:
-                value = header_filter.parser_fn(value)
+                if header_filter is not None:
+                    value = header_filter.parser_fn(value)
                 equivalence.append(value)
             parsed_equivalence_mapping.append(equivalence)
         return parsed_equivalence_mapping
 
+    def get_equivalence_index(self):
+        if Item._equivalence_index is None:
+            index = {}
+            for mapping in self.parse_equivalent_items():
+                if len(mapping) == 0:
+                    continue
+                for value in mapping:
+                    # the first mapping a value appears in wins
+                    index.setdefault(value, mapping[0])
+            Item._equivalence_index = index
+        return Item._equivalence_index
+
     def get_equivalent(self, other):
         assert isinstance(other, Item), "Encountered an invalid item (%s: %s)" % (
             type(other),
             other,
         )
+        return self.get_equivalence_index().get(other.get_primary())
 
-        equivalence_mapping = self.parse_equivalent_items()
-        for mapping in equivalence_mapping:
-            if other.get_primary() in mapping:
-                return mapping[0]
-        return None
+    def get_key(self):
+        # primary value with equivalences resolved. Computed once per item, then used for hashing and equality
+        if self._key_version is not Item._equivalence_version:
+            primary = self.get_primary()
+            equivalent = self.get_equivalence_index().get(primary)
+            self._key = primary if equivalent is None else equivalent
+            self._key_version = Item._equivalence_version
+        return self._key
 
     def __eq__(self, other):
         if isinstance(other, Item):
-            return hash(self) == hash(other)
+            return self.get_key() == other.get_key()
         return False
 
     def __lt__(self, other):
@@ -238,15 +294,24 @@ class Item:
         return (
             "{description}, "
             "QTY: {quantity}, "
-            "{category}-{propel_number}".format(**self.__dict__)
+            "{category}-{propel_number}".format(
+                description=self.description,
+                quantity=self.quantity,
+                category=self.category,
+                propel_number=self.propel_number,
+            )
         )
 
-    def to_list(self, *names):
+    def to_list(self, *names, overrides=None):
+        # overrides maps attribute names to values listed instead of the item's own
         if len(names) == 0:
             names = self.get_header()
         l = []
         for name in names:
-            l.append(self.__dict__[name])
+            if overrides is not None and name in overrides:
+                l.append(overrides[name])
+            else:
+                l.append(getattr(self, name))
 
         return l
 
@@ -297,11 +362,7 @@ class Item:
         return diff_prop_names
 
     def __hash__(self):
-        equivalent_prop = self.get_equivalent(self)
-        if equivalent_prop is None:
-            return hash(self.get_primary())
-        else:
-            return hash(equivalent_prop)
+        return hash(self.get_key())
 
     def __str__(self):
         return str(self.get_primary())
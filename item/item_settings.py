@@ -0,0 +1,44 @@
+import hashlib
+
+from .categories import get_category_tables
+from .common_filters import get_common_filters_by_name, install_common_filters
+from .item import Item
+
+
+class ItemSettings:
+    """
+    Picklable copy of the process wide settings items are parsed with: the common header filters, the primary
+    prop and the equivalent items. Worker processes start with none of them, so BOM loads in a process pool
+    install a snapshot of the parent's settings first.
+    """
+
+    def __init__(self, common_filters, primary_prop, equivalent_items):
+        self.common_filters = common_filters
+        self.primary_prop = primary_prop
+        self.equivalent_items = equivalent_items
+
+    @classmethod
+    def capture(cls):
+        return cls(
+            get_common_filters_by_name(),
+            Item.item_primary_prop,
+            list(Item.equivalent_items),
+        )
+
+    def install(self):
+        install_common_filters(self.common_filters)
+        Item.set_primary_prop(self.primary_prop)
+        Item.set_equivalent_mapping(self.equivalent_items)
+
+    def fingerprint(self):
+        """
+        Digest of everything that changes how a file is parsed: the filters (in matching order), the primary prop,
+        the equivalent items and the category names convert_cat maps.
+        """
+        signature = (
+            [header_filter.get_signature() for header_filter in self.common_filters.values()],
+            self.primary_prop,
+            [list(items) for items in self.equivalent_items],
+            sorted(get_category_tables().name.items()),
+        )
+        return hashlib.sha256(repr(signature).encode("utf-8")).hexdigest()
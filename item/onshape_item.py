@@ -17,18 +17,22 @@ HEADER_FILTER_NAMES = (
 
 
 class OnshapeItem(Item):
-    def __init__(self, header):
-        super(OnshapeItem, self).__init__(header)
+    __slots__ = ()
 
-        self.header_filters = get_filters(*HEADER_FILTER_NAMES)
+    @classmethod
+    def create_header_filters(cls):
+        return get_filters(*HEADER_FILTER_NAMES)
 
 
 class StructuredOnshapeItem(StructuredBomItem):
-    def __init__(self, header):
-        super(StructuredOnshapeItem, self).__init__(header)
-        self.header_filters = get_filters(*HEADER_FILTER_NAMES)
-        self.header_filters.extend(
+    __slots__ = ()
+
+    @classmethod
+    def create_header_filters(cls):
+        header_filters = get_filters(*HEADER_FILTER_NAMES)
+        header_filters.extend(
             [
-                HeaderFilter("tree_num", ("Item",), self.convert_item_no, True),
+                HeaderFilter("tree_num", ("Item",), cls.convert_item_no, True),
             ]
         )
+        return header_filters
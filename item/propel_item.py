@@ -1,6 +1,5 @@
 from item.header_filter import HeaderFilter
 from item.structured_item import StructuredBomItem
-from item.tree_counter import TreeCounter
 
 from .common_filters import convert_level, get_filters
 from .item import Item
@@ -27,42 +26,43 @@ HEADER_FILTER_NAMES = (
 
 
 class PropelItem(Item):
-    def __init__(self, header):
-        super(PropelItem, self).__init__(header)
+    __slots__ = ()
 
-        self.header_filters = get_filters(*HEADER_FILTER_NAMES)
+    @classmethod
+    def create_header_filters(cls):
+        return get_filters(*HEADER_FILTER_NAMES)
 
 
 class StructuredPropelItem(StructuredBomItem):
-    _tree_counter = None
+    __slots__ = ()
 
-    def __init__(self, header):
-        super(StructuredPropelItem, self).__init__(header)
-        self.header_filters = get_filters(*HEADER_FILTER_NAMES)
-        self.header_filters.extend(
+    @classmethod
+    def create_header_filters(cls):
+        header_filters = get_filters(*HEADER_FILTER_NAMES)
+        header_filters.extend(
             [
                 HeaderFilter("level", "Level", convert_level, True),
                 HeaderFilter("tree_num", ("ITEM NO.", "#", "Tree Num"), str),
             ]
         )
+        return header_filters
 
-    def _parse_tree_num(self):
+    def _parse_tree_num(self, tree_counter=None):
         if len(self.tree_num) == 0:
             assert self.level is not None
-            assert self._tree_counter is not None
-            self.tree_num, self.parent_num = self._tree_counter.get_tree_num(self.level)
+            assert tree_counter is not None
+            self.tree_num, self.parent_num = tree_counter.get_tree_num(self.level)
+            return int(self.tree_num.split(".")[0])
         else:
-            super(StructuredPropelItem, self)._parse_tree_num()
+            return super(StructuredPropelItem, self)._parse_tree_num(tree_counter)
 
     @classmethod
-    def from_line(cls, header, line, primary_prop_name=None):
-        obj = super(StructuredBomItem, cls).from_line(header, line, primary_prop_name)
+    def from_line(cls, header, line, primary_prop_name=None, plan=None):
+        obj = super(StructuredBomItem, cls).from_line(
+            header, line, primary_prop_name, plan
+        )
 
         if obj.level is None:
             return None
         else:
             return obj
-
-    @classmethod
-    def set_tree_counter(cls, min_level):
-        cls._tree_counter = TreeCounter(min_level)
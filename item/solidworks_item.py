@@ -26,23 +26,27 @@ HEADER_FILTER_NAMES = (
 
 
 class SolidworksItem(Item):
-    def __init__(self, header):
-        super(SolidworksItem, self).__init__(header)
+    __slots__ = ()
 
-        self.header_filters = get_filters(*HEADER_FILTER_NAMES)
+    @classmethod
+    def create_header_filters(cls):
+        return get_filters(*HEADER_FILTER_NAMES)
 
 
 class StructuredSolidworksItem(StructuredBomItem):
-    def __init__(self, header):
-        super(StructuredSolidworksItem, self).__init__(header)
-        self.header_filters = get_filters(*HEADER_FILTER_NAMES)
-        self.header_filters.extend(
+    __slots__ = ()
+
+    @classmethod
+    def create_header_filters(cls):
+        header_filters = get_filters(*HEADER_FILTER_NAMES)
+        header_filters.extend(
             [
                 HeaderFilter(
                     "tree_num",
                     ("ITEM NO.", "Level", "#", "Tree Num"),
-                    self.convert_item_no,
+                    cls.convert_item_no,
                     True,
                 ),
             ]
         )
+        return header_filters
@@ -2,12 +2,13 @@ from .item import Item
 
 
 class StructuredBomItem(Item):
-    MAX_PARENT = 0
+    __slots__ = ("tree_num", "level", "parent", "parent_num")
 
     def __init__(self, header):
         super(StructuredBomItem, self).__init__(header)
         self.tree_num = ""
         self.level = 0
+        self.parent_num = ""
 
         self.parent = None
 
@@ -18,18 +19,19 @@ class StructuredBomItem(Item):
                 x = str(int(x))
             else:
                 x = str(x)
+        elif isinstance(x, int):
+            x = str(x)
         return x
 
-    def _parse_tree_num(self):
+    def _parse_tree_num(self, tree_counter=None):
+        # returns the top level number so the BOM can keep track of the highest one it has seen
         num_split = self.tree_num.split(".")
         self.parent_num = ".".join(num_split[:-1])
         self.level = len(num_split)
-        top_level = int(num_split[0])
-        if self.__class__.MAX_PARENT < top_level:
-            self.__class__.MAX_PARENT = top_level
+        return int(num_split[0])
 
-    def to_list(self, *names):
-        list_item = super(StructuredBomItem, self).to_list(*names)
+    def to_list(self, *names, overrides=None):
+        list_item = super(StructuredBomItem, self).to_list(*names, overrides=overrides)
         if self.parent is not None:
             list_item.append(self.parent.item_code)
             list_item.append(self.parent_num)
@@ -41,21 +43,3 @@ class StructuredBomItem(Item):
         header.append("Parent Item Code")
         header.append("Parent #")
         return header
-
-    @classmethod
-    def from_line(cls, header, line, primary_prop_name=None):
-        obj = super(StructuredBomItem, cls).from_line(header, line, primary_prop_name)
-        obj._assign_tree_num()
-        return obj
-
-    @classmethod
-    def from_item(cls, other, header=None):
-        obj = super(StructuredBomItem, cls).from_item(other, header)
-        obj._assign_tree_num()
-        return obj
-
-    def _assign_tree_num(self):
-        if len(self.tree_num) != 0:
-            return
-        self.__class__.MAX_PARENT += 1
-        self.tree_num = str(self.__class__.MAX_PARENT)
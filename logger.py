@@ -1,5 +1,10 @@
+import atexit
 import logging
 import datetime
+import multiprocessing
+import multiprocessing.util
+import os
+import queue
 from logging import handlers
 
 
@@ -17,43 +22,89 @@ class MyFormatter(logging.Formatter):
 
 
 class LoggerManager:
+    """
+    The app's logger. Records are handed to a QueueListener thread that formats and writes them, so logging never
+    waits on the log file. The level and handlers start out as DEFAULT_CONFIG and come from settings.yaml once it's
+    loaded, see configure().
+    Messages that take work to build should be guarded with logger.isEnabledFor(logging.DEBUG).
+    """
+
     logger = None
+    listener = None
+    # what the handlers were made with: level name, log file ("" for none) and whether to print to the console
+    config = None
+    DEFAULT_CONFIG = dict(level="DEBUG", file_name="bom_diff.log", console=True)
+    FORMAT = "%(levelname)s\t%(asctime)s\t[%(name)s, %(filename)s:%(lineno)d]\t%(message)s"
+
+    # log files this process has opened. They're appended to from then on
+    _opened_paths = set()
 
     def __init__(self):
         raise Exception("{} is class only".format(self.__class__.__name__))
 
     @classmethod
     def get_logger(cls):
-        log_config = dict(
-            name="bom_diff",
-            level=logging.DEBUG,
-            file_name="bom_diff.log",
-            format="%(levelname)s\t%(asctime)s\t[%(name)s, %(filename)s:%(lineno)d]\t%(message)s"
-        )
-        log_config["path"] = "./" + log_config["file_name"]
-
         if cls.logger is not None:
             return cls.logger
-        cls.logger = cls._create_logger(**log_config)
+        cls.logger = logging.getLogger("bom_diff")
+        cls._install(dict(cls.DEFAULT_CONFIG))
+
+        # whatever is still queued is written before the process exits. Worker processes skip atexit, so they're
+        # covered by a multiprocessing finalizer
+        atexit.register(cls._stop_listener)
+        multiprocessing.util.Finalize(None, cls._stop_listener, exitpriority=0)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=cls._restart_in_child)
         return cls.logger
 
-    @staticmethod
-    def _create_logger(**kwargs):
-        name = kwargs["name"]
-        path = kwargs["path"]
-        level = kwargs["level"]
-        format = kwargs["format"]
-        # suffix = kwargs["suffix"]
+    @classmethod
+    def configure(cls, level=None, file_name=None, console=None):
+        """
+        Applies the log settings from settings.yaml. level is a logging level name such as "INFO", file_name is the
+        log file ("" to not write one) and console is whether to print records too. None keeps the current value.
+        """
+        cls.get_logger()
+        config = dict(cls.config)
+        if level is not None:
+            if not isinstance(logging.getLevelName(str(level).upper()), int):
+                raise ValueError("'%s' is not a log level" % level)
+            config["level"] = str(level).upper()
+        if file_name is not None:
+            config["file_name"] = file_name
+        if console is not None:
+            config["console"] = bool(console)
+        if config != cls.config:
+            cls._install(config)
 
-        logger = logging.getLogger(name)
-        logger.setLevel(level)
+    @classmethod
+    def get_config(cls):
+        # picklable, for worker processes to configure() their logger like this one
+        cls.get_logger()
+        return dict(cls.config)
 
-        formatter = MyFormatter(format)
+    @classmethod
+    def _install(cls, config, append=False):
+        cls._stop_listener()
+        logger = cls.logger
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
 
-        file_handler = logging.FileHandler(path, mode='w')
-        file_handler.setLevel(level)
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        level = logging.getLevelName(config["level"])
+        logger.setLevel(level)
+        formatter = MyFormatter(cls.FORMAT)
+        log_handlers = []
+
+        if config["file_name"]:
+            path = "./" + config["file_name"]
+            # worker processes (see bom.bom_loader) append to the log the main process started. The main process
+            # appends too once it has emptied the file, so lines written by workers in the meantime aren't
+            # overwritten
+            is_main = multiprocessing.current_process().name == "MainProcess"
+            if is_main and not append and path not in cls._opened_paths:
+                open(path, "w").close()
+            cls._opened_paths.add(path)
+            log_handlers.append(logging.FileHandler(path, mode="a"))
 
         # rotate_handle = handlers.TimedRotatingFileHandler(
         #     path,
@@ -64,9 +115,30 @@ class LoggerManager:
         # rotate_handle.suffix = suffix
         # logger.addHandler(rotate_handle)
 
-        print_handle = logging.StreamHandler()
-        print_handle.setLevel(level)
-        print_handle.setFormatter(formatter)
-        logger.addHandler(print_handle)
+        if config["console"]:
+            log_handlers.append(logging.StreamHandler())
+
+        for handler in log_handlers:
+            handler.setLevel(level)
+            handler.setFormatter(formatter)
+
+        records = queue.Queue()
+        cls.listener = handlers.QueueListener(records, *log_handlers, respect_handler_level=True)
+        logger.addHandler(handlers.QueueHandler(records))
+        cls.listener.start()
+        cls.config = config
 
-        return logger
+    @classmethod
+    def _stop_listener(cls):
+        # writes out what's queued. The handlers stay open until they're replaced
+        listener = cls.listener
+        cls.listener = None
+        if listener is not None:
+            listener.stop()
+
+    @classmethod
+    def _restart_in_child(cls):
+        # a forked process doesn't get the listener thread, so records would pile up in the queue unwritten
+        cls.listener = None
+        cls._install(cls.config, append=True)
+        multiprocessing.util.Finalize(None, cls._stop_listener, exitpriority=0)
@@ -1,3 +1,5 @@
+import multiprocessing
+
 from logger import LoggerManager
 from ui import VERSION
 
@@ -16,6 +18,8 @@ try:
 
 
     if __name__ == '__main__':
+        # BOMs are loaded in worker processes, which frozen builds need to be able to start
+        multiprocessing.freeze_support()
         main()
 except BaseException as e:
     logger.error(str(e), exc_info=True)
@@ -0,0 +1,116 @@
+"""
+Timed spans and counters for one diff run. Library code reports into whichever run the current thread has started:
+
+    run_metrics = metrics.start_run()
+    with metrics.span("build tree"):
+        ...
+    metrics.count("rows parsed", len(items))
+    metrics.finish_run()
+    print(run_metrics.format())
+
+Outside of a run spans and counts do nothing. Both are meant for once per stage or per file, not per item, so they
+can stay on. Code in worker processes reports into nothing, the wait for it is timed in the parent.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+
+class RunMetrics:
+    def __init__(self):
+        # [depth, name, seconds] in the order the spans started. seconds is None while a span is open
+        self.spans = []
+        self.counters = {}
+        self._depth = 0
+        self._stage = None
+        self._start = time.perf_counter()
+        self.total_seconds = None
+
+    @contextmanager
+    def span(self, name):
+        entry = [self._depth, name, None]
+        self.spans.append(entry)
+        self._depth += 1
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry[2] = time.perf_counter() - t0
+            self._depth -= 1
+
+    def start_stage(self, name):
+        # a top level span that lasts until the next stage starts or the run finishes
+        self.end_stage()
+        self._stage = self.span(name)
+        self._stage.__enter__()
+
+    def end_stage(self):
+        if self._stage is not None:
+            stage = self._stage
+            self._stage = None
+            stage.__exit__(None, None, None)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def finish(self):
+        self.end_stage()
+        self.total_seconds = time.perf_counter() - self._start
+
+    def stage_seconds(self):
+        # [(name, seconds)] of the top level spans
+        return [(name, seconds) for depth, name, seconds in self.spans if depth == 0 and seconds is not None]
+
+    def format(self):
+        # the per stage breakdown, one line per span and counter
+        lines = []
+        for depth, name, seconds in self.spans:
+            if seconds is not None:
+                lines.append("%-32s %10.1f ms" % ("  " * depth + name, seconds * 1e3))
+        if self.total_seconds is not None:
+            lines.append("%-32s %10.1f ms" % ("total", self.total_seconds * 1e3))
+        for name in sorted(self.counters):
+            lines.append("%-32s %10s" % (name, self.counters[name]))
+        return "\n".join(lines)
+
+
+class _NoMetrics:
+    # stands in for a run outside of one
+
+    @contextmanager
+    def span(self, name):
+        yield
+
+    def count(self, name, n=1):
+        pass
+
+
+_NO_METRICS = _NoMetrics()
+_local = threading.local()
+
+
+def current():
+    return getattr(_local, "metrics", _NO_METRICS)
+
+
+def start_run():
+    # a new RunMetrics the current thread reports into until finish_run()
+    run_metrics = RunMetrics()
+    _local.metrics = run_metrics
+    return run_metrics
+
+
+def finish_run():
+    run_metrics = current()
+    _local.metrics = _NO_METRICS
+    if isinstance(run_metrics, RunMetrics):
+        run_metrics.finish()
+    return run_metrics
+
+
+def span(name):
+    return current().span(name)
+
+
+def count(name, n=1):
+    current().count(name, n)
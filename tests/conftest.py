@@ -0,0 +1,14 @@
+import pytest
+
+from benchmarks.common import setup_filters
+from item.item import Item
+
+
+@pytest.fixture(autouse=True)
+def filters():
+    # the filters a Propel/Solidworks settings.yaml ends up with, and no equivalences
+    setup_filters()
+    Item.set_primary_prop("propel_number")
+    Item.set_equivalent_mapping([])
+    yield
+    Item.set_equivalent_mapping([])
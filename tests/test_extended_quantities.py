@@ -0,0 +1,68 @@
+import csv
+
+import pytest
+
+from bom import EXTENDED_QUANTITIES, RAW_QUANTITIES, SolidworksStructured
+from ui.config import Config
+
+HEADER = ["ITEM NO.", "PART NUMBER", "Description", "QTY."]
+
+
+def load_bom(tmp_path, rows):
+    path = str(tmp_path / "bom.csv")
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    return SolidworksStructured.from_file(path)
+
+
+def quantities(flattened):
+    return {item.propel_number: quantity for item, quantity in flattened.items()}
+
+
+def test_quantities_multiply_through_assemblies(tmp_path):
+    # a screw used 4 times in an assembly used 3 times, and twice more on its own
+    bom = load_bom(
+        tmp_path,
+        [
+            ["1", "100", "frame", "3"],
+            ["1.1", "200", "screw", "4"],
+            ["2", "200", "screw", "2"],
+        ],
+    )
+    assert quantities(bom.get_flattened(RAW_QUANTITIES)) == {"100": 3, "200": 6}
+    assert quantities(bom.get_flattened(EXTENDED_QUANTITIES)) == {"100": 3, "200": 14}
+
+
+def test_blank_assembly_quantity(tmp_path):
+    bom = load_bom(
+        tmp_path,
+        [
+            ["1", "100", "frame", ""],
+            ["1.1", "300", "bracket", "2"],
+            ["1.1.1", "200", "screw", "4"],
+            ["2", "200", "screw", "1"],
+        ],
+    )
+    # the blank quantity counts 0 for the frame and leaves the quantities below it as they are
+    assert quantities(bom.extended_quantities()) == {"100": 0, "300": 2, "200": 9}
+
+    bom.flattened_to_csv(str(tmp_path / "flattened.csv"), EXTENDED_QUANTITIES)
+    with open(str(tmp_path / "flattened.csv"), newline="") as file:
+        assert len(list(csv.reader(file))) == 4
+
+
+def test_unknown_flatten_mode(tmp_path):
+    bom = load_bom(tmp_path, [["1", "100", "frame", "1"]])
+    with pytest.raises(ValueError):
+        bom.get_flattened("Extended")
+    with pytest.raises(ValueError):
+        bom.set_flatten_mode("Extended")
+
+
+def test_settings_reject_unknown_flatten_mode(tmp_path):
+    path = tmp_path / "settings.yaml"
+    path.write_text("flatten_mode: Extended\n")
+    with pytest.raises(ValueError):
+        Config(str(path))
@@ -0,0 +1,101 @@
+"""
+BOM.diff against the set intersection / items.index implementation it replaced, on random BOM pairs with repeated
+part numbers and equivalences.
+"""
+import random
+
+import pytest
+
+from bom import PropelBOM, SolidworksBOM
+from item.item import Item
+
+HEADER = {"PART NUMBER": 0, "Description": 1, "Quantity": 2, "Revision": 3}
+
+
+def reference_diff(self, other):
+    # BOM.diff before items_by_key
+    common_parts_self = []
+    common_parts_other = []
+    common_parts_diff_attrs = []
+    item_ids = [id(x) for x in self.items]
+    other_ids = [id(x) for x in other.items]
+    for item in sorted(self.items_set.intersection(other.items_set)):
+        if id(item) in item_ids:
+            index = other.items.index(item)
+            other_item = other.items[index]
+            common_parts_self.append(item)
+            common_parts_other.append(other_item)
+        elif id(item) in other_ids:
+            index = self.items.index(item)
+            other_item = self.items[index]
+            common_parts_other.append(item)
+            common_parts_self.append(other_item)
+        else:
+            common_parts_diff_attrs.append([])
+            continue
+        common_parts_diff_attrs.append(item.diff(other_item, self.item_diff_names))
+
+    self_only = sorted(self.items_set.difference(other.items_set))
+    other_only = sorted(other.items_set.difference(self.items_set))
+    return (
+        common_parts_self,
+        common_parts_other,
+        common_parts_diff_attrs,
+        self_only,
+        other_only,
+    )
+
+
+def random_bom(cls, rnd):
+    bom = cls(cls.__name__)
+    bom.header = HEADER
+    bom.set_diff_props(["description", "quantity", "revision"])
+    # few enough part numbers that most BOMs list some of them twice
+    for _ in range(rnd.randint(0, 50)):
+        bom.append(
+            bom.create_item(
+                [
+                    str(rnd.randint(0, 60)),
+                    "part %d" % rnd.randint(0, 2),
+                    str(rnd.randint(1, 3)),
+                    str(rnd.randint(1, 2)),
+                ]
+            )
+        )
+    return bom
+
+
+def identities(diff_report):
+    # the report with items by identity, so the same equal-comparing item has to be picked as before
+    return [[part if isinstance(part, list) else id(part) for part in parts] for parts in diff_report]
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_diff_matches_reference(seed):
+    rnd = random.Random(seed)
+    Item.set_equivalent_mapping(
+        [[str(rnd.randint(0, 60)), str(rnd.randint(0, 60))] for _ in range(rnd.randint(0, 10))]
+    )
+    left = random_bom(SolidworksBOM, rnd)
+    right = random_bom(PropelBOM, rnd)
+
+    for self_bom, other_bom in ((left, right), (right, left)):
+        assert identities(self_bom.diff(other_bom)) == identities(reference_diff(self_bom, other_bom))
+
+
+def test_columnar_diff_after_extend():
+    left = SolidworksBOM("left")
+    right = PropelBOM("right")
+    for bom, quantity in ((left, "1"), (right, "2")):
+        bom.header = HEADER
+        bom.set_diff_props(["description", "quantity", "revision"])
+        bom.append(bom.create_item(["100", "part", quantity, "1"]))
+    left.set_columnar_diff(True)
+    assert list(left.diff(right)[2][0]) == ["quantity"]
+
+    # the columns built by the first diff have to pick up the added quantity
+    extra = SolidworksBOM("extra")
+    extra.header = HEADER
+    extra.append(extra.create_item(["100", "part", "1", "1"]))
+    left.extend(extra)
+    assert list(left.diff(right)[2][0]) == []
@@ -1,12 +1,23 @@
+import logging
 import os
 import platform
 import pprint
+import queue
 import subprocess
 import tkinter as tk
 from tkinter import filedialog, messagebox
 
-from bom import OnshapeBOM, PropelBOM, PropelStructured, SolidworksBOM
-from helpers.xlsx_converter import report_to_xlsx
+from bom import STRUCTURED_BOM_TYPES, IncrementalDiff, PropelStructured, load_boms
+from helpers.diff_pipeline import (
+    CANCELLED,
+    DONE,
+    ERROR,
+    PROGRESS,
+    STAGES,
+    DiffJob,
+    DiffWorker,
+    cache_from_config,
+)
 from item.common_filters import create_filters_from_config
 from item.item import Item
 from logger import LoggerManager
@@ -18,12 +29,8 @@ from .config import Config
 logger = LoggerManager.get_logger()
 
 
-BOM_TYPES = {
-    "solidworks": SolidworksBOM,
-    "propel": PropelBOM,
-    "onshape": OnshapeBOM,
-    "generic": PropelBOM,
-}
+# how often the Tk loop checks on a running diff (ms)
+WORKER_POLL_INTERVAL = 100
 
 
 class BomDiffUI:
@@ -54,6 +61,13 @@ class BomDiffUI:
         self.save_settings_button = None
         self.walkthrough_button = None
         self.concat_button = None
+        self.cancel_button = None
+        self.status_label = None
+        self.status_text = tk.StringVar()
+
+        self.diff_worker = None
+        # kept between diffs, so re-running after editing one BOM only re-diffs what changed
+        self.diff_session = IncrementalDiff()
 
         self.left_column = UiColumn(self.window, 0, 1, self.config)
         self.right_column = UiColumn(self.window, 1, 1, self.config)
@@ -71,6 +85,8 @@ class BomDiffUI:
 
         self.make_submit_button()
         self.make_concat_button()
+        self.make_cancel_button()
+        self.make_status_label()
         self.make_show_common_checkbox(7)
         self.make_settings_button()
         # self.make_save_settings_button()
@@ -81,11 +97,18 @@ class BomDiffUI:
     def load_config(self, path=None, override_ui=True):
         if path is None:
             path = self.default_config_path
+        if self.diff_worker is not None:
+            # the worker reads the filters this would replace
+            logger.debug("Not loading config from %s while a diff runs" % path)
+            messagebox.showwarning("Busy", "Settings can't be loaded while a diff is running.")
+            return False
         try:
             logger.debug("Loading config from %s" % path)
             self.config.load(path)
+            self.config.configure_logging()
 
-            logger.debug("Config:\n%s" % str(pprint.pformat(self.config.to_dict())))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Config:\n%s" % str(pprint.pformat(self.config.to_dict())))
 
             if override_ui:
                 self.left_column.set_entry_text(self.config.left_bom)
@@ -157,6 +180,21 @@ class BomDiffUI:
         )
         self.concat_button.pack(side="left", padx=5)
 
+    def make_cancel_button(self):
+        self.cancel_button = tk.Button(
+            master=self.button_frame,
+            text="Cancel",
+            command=self.cancel_button_fn,
+            state=tk.DISABLED,
+        )
+        self.cancel_button.pack(side="left", padx=5)
+
+    def make_status_label(self):
+        self.status_label = tk.Label(
+            master=self.button_frame, textvariable=self.status_text
+        )
+        self.status_label.pack(side="left", padx=5)
+
     def make_show_common_checkbox(self, row):
         checkbox_frame = tk.Frame(
             master=self.window,
@@ -230,88 +268,6 @@ class BomDiffUI:
         )
         return output_path
 
-    def report_struct_diff(
-        self, left_bom, right_bom, left_type, right_type, output_path
-    ):
-        logger.debug("Attempting a diff on %s and %s" % (left_bom.name, right_bom.name))
-
-        left_top_level_cls = BOM_TYPES[left_type]
-        right_top_level_cls = BOM_TYPES[right_type]
-
-        try:
-            logger.debug("Getting diff props")
-            left_bom.set_diff_props(self.settings_ui.get_diff_props())
-            left_bom.set_show_props(self.settings_ui.get_show_props())
-            left_bom.set_ignored_categories(self.settings_ui.get_ignored_categories())
-
-            right_bom.set_diff_props(self.settings_ui.get_diff_props())
-            right_bom.set_show_props(self.settings_ui.get_show_props())
-            right_bom.set_ignored_categories(self.settings_ui.get_ignored_categories())
-
-            logger.debug("Diff props: %s" % left_bom.item_diff_names)
-            logger.debug("Show props: %s" % left_bom.item_show_names)
-
-            logger.debug("Diffing left and right")
-            diff_report = left_bom.diff(right_bom)
-
-            logger.debug("Generating table")
-            report, color_mapping = left_bom.diff_report_to_table(
-                diff_report, right_bom, self.show_common()
-            )
-
-            logger.debug("Generating xlsx")
-            workbook = report_to_xlsx(report, color_mapping, "Diff", path=None)
-
-            logger.debug("Creating assembly only bom for left")
-            left_assem_bom = left_bom.from_tree(
-                left_bom.name, left_bom.assemblies_only()
-            )
-            left_assem_bom = left_top_level_cls.from_list(
-                left_assem_bom.name, left_assem_bom.flattened
-            )
-            left_assem_bom.set_diff_props(self.settings_ui.get_diff_props())
-            left_assem_bom.set_show_props(self.settings_ui.get_show_props())
-            left_assem_bom.set_ignored_categories(
-                self.settings_ui.get_ignored_categories()
-            )
-
-            logger.debug("Creating assembly only bom for right")
-            right_assem_bom = right_bom.from_tree(
-                right_bom.name, right_bom.assemblies_only()
-            )
-            right_assem_bom = right_top_level_cls.from_list(
-                right_assem_bom.name, right_assem_bom.flattened
-            )
-            right_assem_bom.set_diff_props(self.settings_ui.get_diff_props())
-            right_assem_bom.set_show_props(self.settings_ui.get_show_props())
-            right_assem_bom.set_ignored_categories(
-                self.settings_ui.get_ignored_categories()
-            )
-
-            logger.debug("Diffing assembly only left and right")
-            toplevel_diff_report = left_assem_bom.diff(right_assem_bom)
-
-            logger.debug("Generating table")
-            report, color_mapping = left_assem_bom.diff_report_to_table(
-                toplevel_diff_report, right_assem_bom, self.show_common()
-            )
-            logger.debug("Generating xlsx")
-            report_to_xlsx(
-                report, color_mapping, "Assemblies only", path=None, workbook=workbook
-            )
-
-            logger.debug("Saving workbook")
-            workbook.save(output_path)
-            return True
-        except BaseException as e:
-            logger.error(str(e), exc_info=True)
-            messagebox.showerror(
-                "Error",
-                "An error occurred while analyzing BOMs! See logs for details.\n%s"
-                % str(e),
-            )
-            return False
-
     def get_boms(self):
         logger.debug("Getting both BOMs")
         self.load_config(override_ui=False)
@@ -322,11 +278,16 @@ class BomDiffUI:
 
         left_path, right_path, left_type, right_type = result
         try:
-            logger.debug("Loading left BOM")
-            left_bom = self.left_column.load_bom(left_path, skip_checks=True)
-
-            logger.debug("Loading right BOM")
-            right_bom = self.right_column.load_bom(right_path, skip_checks=True)
+            logger.debug("Loading left and right BOMs")
+            left_bom, right_bom = load_boms(
+                [
+                    (STRUCTURED_BOM_TYPES[left_type], left_path),
+                    (STRUCTURED_BOM_TYPES[right_type], right_path),
+                ],
+                cache=cache_from_config(self.config),
+            )
+            left_bom.set_diff_props(self.config.diff_properties)
+            right_bom.set_diff_props(self.config.diff_properties)
             return left_bom, right_bom, left_type, right_type
         except BaseException as e:
             logger.error(str(e), exc_info=True)
@@ -354,13 +315,17 @@ class BomDiffUI:
             )
             return None
 
-        result = self.get_boms()
+        self.load_config(override_ui=False)
+        result = self.check_inputs()
         if result is None:
             return
 
-        left_bom, right_bom, left_type, right_type = result
+        left_path, right_path, left_type, right_type = result
 
-        default_name = "%s + %s diff.xlsx" % (left_bom.name, right_bom.name)
+        default_name = "%s + %s diff.xlsx" % (
+            os.path.basename(left_path),
+            os.path.basename(right_path),
+        )
 
         default_path = self.config.get_default_save_dir()
         logger.debug(
@@ -403,16 +368,93 @@ class BomDiffUI:
             logger.debug("Canceling diff")
             return
 
-        success = self.report_struct_diff(
-            left_bom, right_bom, left_type, right_type, output_path
+        job = DiffJob(
+            left_path,
+            left_type,
+            right_path,
+            right_type,
+            output_path,
+            # copies, so editing these in the settings window while the diff runs can't change it mid-way. Loading
+            # settings, which replaces the filters, waits until the diff is done (see load_config)
+            list(self.settings_ui.get_diff_props()),
+            list(self.settings_ui.get_show_props()),
+            list(self.settings_ui.get_ignored_categories()),
+            self.show_common(),
+            cache_from_config(self.config),
+            bool(self.config.columnar_diff),
+            self.diff_session,
+            bool(self.config.skip_identical_assemblies),
+            self.config.flatten_mode,
         )
-        if not success:
-            return
-        answer = messagebox.askyesno("Success!", "Open generated file?")
+        self.start_diff_worker(job)
 
-        if answer:
-            logger.debug("Opening associated app")
-            self.open_with_app(output_path)
+    def start_diff_worker(self, job):
+        logger.debug(
+            "Starting diff of %s and %s" % (job.left_path, job.right_path)
+        )
+        self.diff_worker = DiffWorker(job)
+        self.set_busy(True)
+        self.diff_worker.start()
+        self.window.after(WORKER_POLL_INTERVAL, self.poll_diff_worker)
+
+    def poll_diff_worker(self):
+        # runs on the Tk thread. The worker only ever talks to the UI through its message queue
+        worker = self.diff_worker
+        while True:
+            try:
+                kind, value = worker.messages.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == PROGRESS:
+                stage, name = value
+                self.status_text.set("%s (%s/%s)..." % (name, stage + 1, len(STAGES)))
+            else:
+                self.diff_worker = None
+                self.set_busy(False)
+                self.finish_diff(kind, value, worker.job.metrics)
+                return
+
+        self.window.after(WORKER_POLL_INTERVAL, self.poll_diff_worker)
+
+    def finish_diff(self, kind, value, run_metrics):
+        if kind == DONE:
+            self.status_text.set("Diff complete (%.1f s)" % run_metrics.total_seconds)
+            timings = "\n".join(
+                "%s: %.2f s" % (name, seconds) for name, seconds in run_metrics.stage_seconds()
+            )
+            answer = messagebox.askyesno("Success!", "%s\n\nOpen generated file?" % timings)
+            if answer:
+                logger.debug("Opening associated app")
+                self.open_with_app(value)
+        elif kind == CANCELLED:
+            self.status_text.set("Diff cancelled")
+        elif kind == ERROR:
+            self.status_text.set("Diff failed")
+            messagebox.showerror(
+                "Error",
+                "An error occurred while analyzing BOMs! See logs for details.\n%s"
+                % str(value),
+            )
+
+    def set_busy(self, busy):
+        if busy:
+            self.diff_button.config(state=tk.DISABLED)
+            self.concat_button.config(state=tk.DISABLED)
+            self.settings_button.config(state=tk.DISABLED)
+            self.cancel_button.config(state=tk.NORMAL)
+        else:
+            self.diff_button.config(state=tk.NORMAL)
+            self.concat_button.config(state=tk.NORMAL)
+            self.settings_button.config(state=tk.NORMAL)
+            self.cancel_button.config(state=tk.DISABLED)
+
+    def cancel_button_fn(self):
+        logger.debug("Cancel button callback")
+        if self.diff_worker is not None:
+            # the worker stops at the next stage boundary (or row, while writing)
+            self.status_text.set("Cancelling...")
+            self.diff_worker.cancel()
 
     def settings_button_fn(self):
         self.settings_ui.open()
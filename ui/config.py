@@ -1,8 +1,10 @@
 import os
 import csv
+import logging
 import yaml
 from pathlib import Path
 
+from bom import FLATTEN_MODES
 from logger import LoggerManager
 
 logger = LoggerManager.get_logger()
@@ -49,6 +51,22 @@ class Config:
         self.equivalent_items = []
         self.all_property_names = []
 
+        # parsed BOMs are cached here. An empty value turns the cache off
+        self.cache_dir = os.path.join("~", ".bom_diff_cache")
+        self.cache_size_mb = 512
+
+        # compare matched items column by column. Faster on very large BOMs
+        self.columnar_diff = False
+        # report identical matched assemblies as one match instead of listing everything in them
+        self.skip_identical_assemblies = True
+        # "raw" or "extended": whether flattened quantities are multiplied through the assemblies above them
+        self.flatten_mode = "raw"
+
+        # logging level name, log file ("" for none) and whether to print the log too. See LoggerManager.configure
+        self.log_level = LoggerManager.DEFAULT_CONFIG["level"]
+        self.log_file = LoggerManager.DEFAULT_CONFIG["file_name"]
+        self.log_to_console = LoggerManager.DEFAULT_CONFIG["console"]
+
         if os.path.isfile(self.path):
             logger.debug("Loading config from %s" % repr(self.path))
             self.load(self.path)
@@ -70,6 +88,24 @@ class Config:
         self.default_save_dir = config.get("default_save_dir", self.default_save_dir)
         self.default_load_dir = config.get("default_load_dir", self.default_load_dir)
         self.ignored_categories = config.get("ignored_categories", [])
+        self.cache_dir = config.get("cache_dir", self.cache_dir)
+        self.cache_size_mb = config.get("cache_size_mb", self.cache_size_mb)
+        self.columnar_diff = config.get("columnar_diff", self.columnar_diff)
+        self.skip_identical_assemblies = config.get(
+            "skip_identical_assemblies", self.skip_identical_assemblies
+        )
+        self.flatten_mode = config.get("flatten_mode", self.flatten_mode)
+        if self.flatten_mode not in FLATTEN_MODES:
+            raise ValueError(
+                "'%s' is an invalid flatten_mode, expected one of %s" % (self.flatten_mode, ", ".join(FLATTEN_MODES))
+            )
+        self.log_level = config.get("log_level", self.log_level)
+        self.log_file = config.get("log_file", self.log_file)
+        self.log_to_console = config.get("log_to_console", self.log_to_console)
+
+        # property names are matched against the filter names, so filters have to be loaded first
+        self.filters = self.parse_filters(config.get("filters", self.filters))
+        self.all_property_names = [name for name in self.filters]
 
         diff_properties = config.get("diff_properties", self.diff_properties)
         self.diff_properties = self.parse_properties(diff_properties)
@@ -77,9 +113,6 @@ class Config:
         show_properties = config.get("show_properties", self.show_properties)
         self.show_properties = self.parse_properties(show_properties)
 
-        self.filters = self.parse_filters(config.get("filters", self.filters))
-        self.all_property_names = [name for name in self.filters]
-
         self.equivalent_items = self.load_csv(self.path.parent / "equivalent_items.csv")
 
         primary_prop = config.get("primary_prop", self.primary_prop)
@@ -112,7 +145,8 @@ class Config:
                     e.__class__.__name__, str(e),
                     "" if not key else " Exception occurred with key '%s'" % key)
             )
-        logger.debug("Loaded filter configs: %s" % repr(configs))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Loaded filter configs: %s" % repr(configs))
         return configs
 
     def parse_properties(self, diff_properties):
@@ -144,6 +178,14 @@ class Config:
             "show_properties": self.show_properties,
             "primary_prop": self.primary_prop,
             "ignored_categories": self.ignored_categories,
+            "cache_dir": self.cache_dir,
+            "cache_size_mb": self.cache_size_mb,
+            "columnar_diff": self.columnar_diff,
+            "skip_identical_assemblies": self.skip_identical_assemblies,
+            "flatten_mode": self.flatten_mode,
+            "log_level": self.log_level,
+            "log_file": self.log_file,
+            "log_to_console": self.log_to_console,
             "filters": {name: config_filter.to_dict() for name, config_filter in self.filters.items()},
         }
 
@@ -171,5 +213,13 @@ class Config:
         logger.debug("Getting load dir")
         return self.get_dialog_dir(self.default_load_dir)
 
+    def get_cache_dir(self):
+        if not self.cache_dir:
+            return None
+        return os.path.expanduser(self.cache_dir)
+
+    def configure_logging(self):
+        LoggerManager.configure(self.log_level, self.log_file or "", self.log_to_console)
+
     def get_ignored_categories_str(self):
         return ", ".join(self.ignored_categories)
@@ -3,20 +3,13 @@ import platform
 import tkinter as tk
 from tkinter import filedialog, messagebox
 
-from bom import OnshapeStructured, PropelStructured, SolidworksStructured, StructuredBOM
+from bom import STRUCTURED_BOM_TYPES
 from logger import LoggerManager
 
 from .tool_tip import create_tool_tip
 
 logger = LoggerManager.get_logger()
 
-BOM_TYPES = {
-    "solidworks": SolidworksStructured,
-    "propel": PropelStructured,
-    "onshape": OnshapeStructured,
-    "generic": StructuredBOM,
-}
-
 BOM_KEYS = ["solidworks", "propel", "onshape", "generic"]
 BOM_VALUES = {key: i for i, key in enumerate(BOM_KEYS)}
 
@@ -305,7 +298,7 @@ class UiColumn:
             return
 
         try:
-            bom.flattened_to_csv(output_path)
+            bom.flattened_to_csv(output_path, self.config.flatten_mode)
         except BaseException as e:
             logger.error(str(e), exc_info=True)
             messagebox.showerror(
@@ -341,7 +334,7 @@ class UiColumn:
 
         try:
             bom_type = self.get_bom_type()
-            bom = BOM_TYPES[bom_type].from_file(path)
+            bom = STRUCTURED_BOM_TYPES[bom_type].from_file(path)
             logger.debug(
                 "%s Opened %s BOM from %s" % (self.log_prefix(), bom_type, path)
             )